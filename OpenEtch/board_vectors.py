@@ -1,15 +1,111 @@
 import math
+import numpy as np
 
 from reportlab.pdfgen import canvas
+from reportlab.pdfgen.canvas import FILL_EVEN_ODD
 from reportlab.lib.units import mm
-import shutil
+from reportlab import rl_config
+import threading
 import uuid
 import os
 
 
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from .mygerber import PCB
 
 
+MIN_ARC_STEPS = 4
+BEZIER_CIRCLE_KAPPA = 0.5522847498
+
+
+def format_subpaths(points: np.ndarray) -> str:
+    """
+    PDF path operators for an (n, m, 2) array of points, one closed subpath per polygon.
+    The whole batch is formatted by a single % operation.
+
+    Points are written in the order given, callers must pass anticlockwise polygons: layer_content fills every
+    subpath as one non-zero winding path, and overlapping copper only stays filled while all subpaths turn the same way.
+    """
+    count, vertex_count, _ = points.shape
+    if count == 0 or vertex_count == 0:
+        return ""
+
+    template = "%.3f %.3f m" + " %.3f %.3f l" * (vertex_count - 1) + " h\n"
+    return (template * count) % tuple(points.ravel().tolist())
+
+
+def format_circles(x: np.ndarray, y: np.ndarray, r: np.ndarray) -> str:
+    """
+    PDF path operators drawing each circle anticlockwise as four bezier curves.
+    Keep them anticlockwise, like format_subpaths' polygons, layer_content relies on it for the non-zero fill.
+    """
+    if len(x) == 0:
+        return ""
+
+    k = r * BEZIER_CIRCLE_KAPPA
+    values = np.stack((
+        x + r, y,
+        x + r, y + k, x + k, y + r, x, y + r,
+        x - k, y + r, x - r, y + k, x - r, y,
+        x - r, y - k, x - k, y - r, x, y - r,
+        x + k, y - r, x + r, y - k, x + r, y
+    ), axis=1)
+
+    template = "%.3f %.3f m" + " %.3f %.3f %.3f %.3f %.3f %.3f c" * 4 + " h\n"
+    return (template * len(x)) % tuple(values.ravel().tolist())
+
+
+class BinaryPageStreams:
+    """
+    Flate only (binary) page streams while inside, without this reportlab's pure python ASCII85 encoder is most of
+    the save time. reportlab reads rl_config.useA85 when the PDF is encoded, so it is only changed for as long as
+    a Vectorizer is saving, and put back once the last concurrent save is done.
+    """
+    lock = threading.Lock()
+    users = 0
+    saved_use_a85 = None
+
+    def __enter__(self):
+        with BinaryPageStreams.lock:
+            if BinaryPageStreams.users == 0:
+                BinaryPageStreams.saved_use_a85 = rl_config.useA85
+                rl_config.useA85 = 0
+            BinaryPageStreams.users += 1
+
+    def __exit__(self, *exc_info):
+        with BinaryPageStreams.lock:
+            BinaryPageStreams.users -= 1
+            if BinaryPageStreams.users == 0:
+                rl_config.useA85 = BinaryPageStreams.saved_use_a85
+
+
+class ContentCache:
+    """ Formatted layer content shared between Vectorizers, safe to use from several threads """
+    def __init__(self):
+        self.__content = {}
+        self.__lock = threading.Lock()
+        self.__key_locks = {}
+
+    def get(self, key, compute):
+        """ Cached content for key, compute() fills it on a miss. Concurrent misses on one key compute it once """
+        with self.__lock:
+            key_lock = self.__key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            if key not in self.__content:
+                self.__content[key] = compute()
+
+            return self.__content[key]
+
+
+@lru_cache(maxsize=64)
+def unit_semicircle(arc_steps: int) -> tuple:
+    """ cos / sin of arc_steps + 1 angles evenly spaced over [0, pi] """
+    angles = np.pi * np.arange(arc_steps + 1) / arc_steps
+    return np.cos(angles), np.sin(angles)
+
+
 class Vectorizer:
     canvas_bottom = None
     canvas_top = None
@@ -17,11 +113,23 @@ class Vectorizer:
     offset_x = 0.15
     offset_y = 0.15
 
-    def __init__(self, pcb: PCB, config: dict, width_multiplier=1.03, x_scale_adjustment=1.00, y_scale_adjustment=1.00):
+    def __init__(self, pcb: PCB, config: dict, width_multiplier=1.03, x_scale_adjustment=1.00, y_scale_adjustment=1.00, arc_tolerance=0.005, union=False, batched=True, content_cache: None | ContentCache = None):
+        """
+        :param arc_tolerance: Max distance (mm) the round trace ends may deviate from a true arc, sets the arc steps per trace width
+        :param union: Merge all copper into net level polygons before writing, far fewer paths (needs shapely)
+        :param batched: Write each layer as one non-zero filled compound path straight into the content stream,
+                        instead of a reportlab path object per trace / pad / hole
+        :param content_cache: ContentCache shared between Vectorizers of the same pcb, so each layer is only transformed
+                              and formatted once however many masks / sides use it (batched mode)
+        """
         self.internal_name = str(uuid.uuid4())
         self.pcb = pcb
 
         self.width_multiplier = width_multiplier
+        self.arc_tolerance = arc_tolerance
+        self.union = union
+        self.batched = batched
+        self.content_cache = content_cache if content_cache is not None else ContentCache()
 
         self.offset_x = -self.pcb.min_xy[0]
         self.offset_y = -self.pcb.min_xy[1]
@@ -78,19 +186,83 @@ class Vectorizer:
 
         return points
 
+    @staticmethod
+    def arc_steps_for(radius, tolerance, min_steps=MIN_ARC_STEPS):
+        """
+        Fewest steps per half circle that keep every chord within tolerance of the true arc.
+        Wide traces get more steps than the old fixed 12 and thin ones fewer, so round ends move by up to tolerance
+        and their edge pixels can rasterise differently, nothing else does.
+        """
+        if radius <= tolerance:
+            return min_steps
+
+        return max(min_steps, math.ceil(math.pi / (2 * math.acos(1 - tolerance / radius))))
+
+    @staticmethod
+    def traces_to_polygons(x1, y1, x2, y2, widths, arc_steps=12):
+        """
+        Batched trace_to_polygon, takes arrays of segment ends and widths.
+        Returns an (n, 2 * (arc_steps + 1), 2) array, one filled trace outline per segment, each anticlockwise.
+        Zero length segments come out as a circle (round dot) rather than being dropped.
+        """
+        dx = x2 - x1
+        dy = y2 - y1
+        length = np.hypot(dx, dy)
+
+        safe_length = np.where(length == 0, 1, length)
+        ux = np.where(length == 0, 1, dx / safe_length)[:, None]
+        uy = np.where(length == 0, 0, dy / safe_length)[:, None]
+
+        r = (np.asarray(widths, dtype=np.float64) / 2)[:, None]
+        cos_a, sin_a = unit_semicircle(arc_steps)
+
+        # Unit semicircle rotated to start perpendicular to the trace, one cap facing back and one forward
+        start_x = x1[:, None] + r * (-uy * cos_a - ux * sin_a)
+        start_y = y1[:, None] + r * (ux * cos_a - uy * sin_a)
+        end_x = x2[:, None] + r * (uy * cos_a + ux * sin_a)
+        end_y = y2[:, None] + r * (-ux * cos_a + uy * sin_a)
+
+        return np.stack((np.concatenate((start_x, end_x), axis=1), np.concatenate((start_y, end_y), axis=1)), axis=2)
+
     def __flatten(self, points):
         return [coord for pt in points for coord in pt]
 
+    def __to_canvas(self, x, y):
+        """ Converts arrays of board positions (mm) to canvas points """
+        return (x + self.offset_x) * mm * self.scale_x, (y + self.offset_y) * mm * self.scale_y
+
+    def __trace_batches(self, x1, y1, x2, y2, board_widths):
+        """
+        traces_to_polygons for traces given in board positions / widths (mm), in canvas space.
+        Same width traces share an arc step count, so one (n, m, 2) batch is yielded per width.
+        """
+        start_x, start_y = self.__to_canvas(x1, y1)
+        end_x, end_y = self.__to_canvas(x2, y2)
+
+        unique_widths, width_index = np.unique(board_widths, return_inverse=True)
+
+        for i, board_width in enumerate(unique_widths.tolist()):
+            mask = width_index == i
+            arc_steps = self.arc_steps_for(board_width / 2, self.arc_tolerance)
+
+            yield self.traces_to_polygons(start_x[mask], start_y[mask], end_x[mask], end_y[mask],
+                                          np.full(np.count_nonzero(mask), board_width * mm), arc_steps)
+
+    def __segment_batches(self, segments):
+        """ __trace_batches for a layer's segments, widened by width_multiplier """
+        return self.__trace_batches(segments["x1"], segments["y1"], segments["x2"], segments["y2"],
+                                    segments["width"] * self.width_multiplier)
+
     def __vectorise_layer(self, active_canvas, layer):
-        if hasattr(layer, "commands"):
-            for command in layer.commands:
-                if command[0] == "line":
-                    x1, y1, x2, y2, width = command[1], command[2], command[3], command[4], command[5]
+        if not hasattr(layer, "geometry"):
+            return
 
-                    points = self.trace_to_polygon((x1+self.offset_x) * mm * self.scale_x, (y1+self.offset_y) * mm  * self.scale_y,
-                                                   (x2+self.offset_x) * mm * self.scale_x, (y2+self.offset_y) * mm  * self.scale_y,
-                                                   (width * self.width_multiplier) * mm)
+        geometry = layer.geometry
 
+        segments = geometry.segments
+        if len(segments) > 0:
+            for polygons in self.__segment_batches(segments):
+                for points in polygons.tolist():
                     path = active_canvas.beginPath()
                     path.moveTo(points[0][0], points[0][1])
                     for point in points[1:]:
@@ -98,51 +270,190 @@ class Vectorizer:
                     path.lineTo(points[0][0], points[0][1])
                     path.close()
 
+                    active_canvas.drawPath(path, stroke=0, fill=1)
 
+        if geometry.polygon_count > 0:
+            vertices = geometry.polygon_vertices
+            canvas_x, canvas_y = self.__to_canvas(vertices[:, 0], vertices[:, 1])
+            canvas_points = np.stack((canvas_x, canvas_y), axis=1)
 
-                    active_canvas.drawPath(path, stroke=0, fill=1)
+            offsets = geometry.polygon_offsets.tolist()
+            for start, end in zip(offsets[:-1], offsets[1:]):
+                if end == start:
+                    continue
 
-                if command[0] == "blit":
-                    points = [((x + self.offset_x) * mm * self.scale_x,
-                               (y + self.offset_y) * mm * self.scale_y) for x, y in command[1]]
+                points = canvas_points[start:end].tolist()
 
-                    path = active_canvas.beginPath()
-                    path.moveTo(points[0][0], points[0][1])
-                    for point in points[1:]:
-                        path.lineTo(point[0], point[1])
-                    path.close()
+                path = active_canvas.beginPath()
+                path.moveTo(points[0][0], points[0][1])
+                for point in points[1:]:
+                    path.lineTo(point[0], point[1])
+                path.close()
 
+                active_canvas.drawPath(path, stroke=0, fill=1)
 
-                    active_canvas.drawPath(path, stroke=0, fill=1)
+        holes = geometry.holes
+        if len(holes) > 0:
+            canvas_x, canvas_y = self.__to_canvas(holes["x"], holes["y"])
+            radii = (holes["diameter"] / 2) * mm
+
+            for x, y, radius in zip(canvas_x.tolist(), canvas_y.tolist(), radii.tolist()):
+                active_canvas.circle(x, y, radius, stroke=0, fill=1)
+
+    def layer_content(self, layer) -> str:
+        """
+        PDF operators filling every trace, pad and hole of a layer as one non-zero winding compound path.
+        Overlaps are only filled because every subpath is anticlockwise (a clockwise one would cancel out the copper
+        under it), see format_subpaths / format_circles
+        """
+        if not hasattr(layer, "geometry"):
+            return ""
+
+        geometry = layer.geometry
+        content = []
+
+        # Every subpath is anticlockwise so overlaps stay filled under the non-zero rule
+        segments = geometry.segments
+        if len(segments) > 0:
+            for polygons in self.__segment_batches(segments):
+                content.append(format_subpaths(polygons))
+
+        if geometry.polygon_count > 0:
+            vertices = geometry.polygon_vertices
+            canvas_x, canvas_y = self.__to_canvas(vertices[:, 0], vertices[:, 1])
+            canvas_points = np.stack((canvas_x, canvas_y), axis=1)
+
+            offsets = geometry.polygon_offsets
+            lengths = np.diff(offsets)
+
+            # Shoelace area per polygon, negative means clockwise
+            next_points = np.roll(canvas_points, -1, axis=0)
+            polygon_ends = offsets[1:] - 1
+            next_points[polygon_ends[lengths > 0]] = canvas_points[offsets[:-1][lengths > 0]]
+            cross = canvas_points[:, 0] * next_points[:, 1] - next_points[:, 0] * canvas_points[:, 1]
+
+            for length in np.unique(lengths[lengths >= 3]).tolist():
+                starts = offsets[:-1][lengths == length]
+                polygons = canvas_points[starts[:, None] + np.arange(length)]
+
+                clockwise = cross[starts[:, None] + np.arange(length)].sum(axis=1) < 0
+                polygons[clockwise] = polygons[clockwise, ::-1]
+
+                content.append(format_subpaths(polygons))
+
+        holes = geometry.holes
+        if len(holes) > 0:
+            canvas_x, canvas_y = self.__to_canvas(holes["x"], holes["y"])
+            content.append(format_circles(canvas_x, canvas_y, (holes["diameter"] / 2) * mm))
+
+        if not any(content):
+            return ""
+
+        return "".join(content) + "f"
 
-                if command[0] == "hole":
-                    x, y, diameter = command[1:]
+    def __vectorise_layer_batched(self, active_canvas, component_name):
+        cache_key = (component_name, self.offset_x, self.offset_y, self.scale_x, self.scale_y, self.width_multiplier, self.arc_tolerance)
 
-                    active_canvas.circle((x + self.offset_x)*mm * self.scale_x, (y + self.offset_y)*mm * self.scale_y, (diameter/2)*mm, stroke=0, fill=1)
+        content = self.content_cache.get(cache_key, lambda: self.layer_content(self.pcb.get_component(component_name)))
+        if content:
+            active_canvas.addLiteral(content)
+
+    def __layer_shapes(self, layer) -> list:
+        """ Every trace, pad and hole of a layer as shapely polygons in canvas space """
+        import shapely  # Optional, only needed for union=True
+
+        geometry = layer.geometry
+        shapes = []
+
+        segments = geometry.segments
+        if len(segments) > 0:
+            for polygons in self.__segment_batches(segments):
+                shapes.extend(shapely.polygons(polygons).tolist())
+
+        if geometry.polygon_count > 0:
+            vertices = geometry.polygon_vertices
+            canvas_x, canvas_y = self.__to_canvas(vertices[:, 0], vertices[:, 1])
+            canvas_points = np.stack((canvas_x, canvas_y), axis=1)
+
+            # Regions (G36 / G37) are often self touching or self intersecting, which union_all would fail on or lose area from
+            offsets = geometry.polygon_offsets.tolist()
+            for start, end in zip(offsets[:-1], offsets[1:]):
+                if end - start >= 3:
+                    shapes.append(shapely.make_valid(shapely.Polygon(canvas_points[start:end])))
+
+        holes = geometry.holes
+        if len(holes) > 0:
+            # A zero length trace is a circle, the diameter is the trace width
+            for polygons in self.__trace_batches(holes["x"], holes["y"], holes["x"], holes["y"], holes["diameter"]):
+                shapes.extend(shapely.polygons(polygons).tolist())
+
+        return shapes
+
+    def __vectorise_union(self, active_canvas, layers) -> None:
+        import shapely  # Optional, only needed for union=True
+
+        shapes = []
+        for layer in layers:
+            if hasattr(layer, "geometry"):
+                shapes.extend(self.__layer_shapes(layer))
+
+        merged = shapely.union_all(shapes)
+
+        # One filled path per merged polygon, its holes cut out by the even-odd rule
+        for polygon in shapely.get_parts(merged).tolist():
+            if not isinstance(polygon, shapely.Polygon) or polygon.is_empty:
+                continue
+
+            path = active_canvas.beginPath()
+            for ring in [polygon.exterior, *polygon.interiors]:
+                points = ring.coords
+                path.moveTo(points[0][0], points[0][1])
+                for point in points[1:]:
+                    path.lineTo(point[0], point[1])
+                path.close()
+
+            active_canvas.drawPath(path, stroke=0, fill=1, fillMode=FILL_EVEN_ODD)
 
     def __vectorise(self, active_canvas, components: list[str]):
-        for component_name in self.pcb:
-            if component_name in components:
-                component = self.pcb.get_component(component_name)
-                self.__vectorise_layer(active_canvas, component)
+        component_names = [component_name for component_name in self.pcb if component_name in components]
+
+        if self.union:
+            self.__vectorise_union(active_canvas, [self.pcb.get_component(component_name) for component_name in component_names])
+            return
+
+        for component_name in component_names:
+            if self.batched:
+                self.__vectorise_layer_batched(active_canvas, component_name)
+            else:
+                self.__vectorise_layer(active_canvas, self.pcb.get_component(component_name))
 
 
     def show(self):
         self.canvas_top.showPage()
 
 
+    @staticmethod
+    def __write_atomic(data: bytes, path: str) -> None:
+        """ Writes next to the destination then renames over it, so a half written PDF is never visible """
+        temp_path = os.path.join(os.path.dirname(os.path.abspath(path)), f".{uuid.uuid4()}.tmp")
+
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
     def save(self, path=None):
         print(f"[Vectorizer] Saving...")
-        self.canvas_top.save()
-
-        if self.canvas_bottom:
-            self.canvas_bottom.save()
 
         if path:
             root_path = ".".join(path.split(".")[:-1]) if path.split(".")[-1] == "pdf" else path
-            shutil.copy(f"{self.internal_name}_top.pdf", f"{root_path}_top.pdf")
-            os.remove(f"{self.internal_name}_top.pdf")
+        else:
+            root_path = self.internal_name
+
+        outputs = [(self.canvas_top, f"{root_path}_top.pdf")]
+        if self.canvas_bottom:
+            outputs.append((self.canvas_bottom, f"{root_path}_bottom.pdf"))
 
-            if self.canvas_bottom:
-                shutil.copy(f"{self.internal_name}_bottom.pdf", f"{root_path}_bottom.pdf")
-                os.remove(f"{self.internal_name}_bottom.pdf")
+        # Page compression (zlib) dominates encoding and releases the GIL, so both sides encode at once
+        with BinaryPageStreams(), ThreadPoolExecutor(max_workers=len(outputs)) as executor:
+            for (_, output_path), data in zip(outputs, executor.map(lambda output: output[0].getpdfdata(), outputs)):
+                self.__write_atomic(data, output_path)
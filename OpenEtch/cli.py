@@ -0,0 +1,177 @@
+"""
+Headless batch processing of gerber zips / directories, for running OpenEtch without a display.
+Never imports pygame or tkinter, the CNC backend is only imported when --cnc is asked for.
+
+Usage: python -m OpenEtch [--etch] [--silk] [--cnc] [-j JOBS] [-o OUTPUT_DIR] input [input ...]
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import glob
+import time
+import os
+
+from .mygerber.pcb import PCB, LAYER_FILES
+from .mygerber.layer_cache import LayerCache, DEFAULT_CACHE_DIR
+
+
+OUTPUTS = ["etch", "silk", "cnc"]
+
+# Generator functions (OpenEtch.gui.generator) writing each mask output
+MASK_GENERATORS = {"etch": "generate_etching_mask", "silk": "generate_silk_mask"}
+
+
+def is_gerber_directory(path: str) -> bool:
+    """ An extracted gerber zip, rather than a directory of zips """
+    return any(os.path.exists(os.path.join(path, file)) for file, _, _, _ in LAYER_FILES)
+
+
+def collect_inputs(inputs: list[str]) -> list[str]:
+    """
+    Expands the command line inputs into a list of boards.
+    Each input can be a gerber zip, an extracted gerber directory, a directory of zips or a glob pattern.
+    """
+    boards = []
+
+    for item in inputs:
+        if os.path.isdir(item) and not is_gerber_directory(item):
+            boards += sorted(glob.glob(os.path.join(item, "*.zip")))
+
+        elif glob.has_magic(item):
+            boards += sorted(glob.glob(item))
+
+        else:
+            boards.append(item)
+
+    # Drop duplicates, keeping the order given
+    return list(dict.fromkeys(boards))
+
+
+def board_output_dir(path: str, output_root: None | str) -> str:
+    """ Same location the GUI uses ("<board>_output"), unless a shared output directory is given """
+    if output_root is None:
+        return f"{path}_output"
+
+    name = os.path.splitext(os.path.basename(os.path.normpath(path)))[0]
+    return os.path.join(output_root, name)
+
+
+def process_board(path: str, outputs: list[str], output_root: None | str, cache_dir: None | str) -> dict:
+    """
+    Loads one board and writes each of the selected outputs, runs inside the worker processes.
+    Errors are returned rather than raised, so one broken board does not stop the batch.
+
+    :return: dict of path, output_dir, timings (seconds per stage), error (None on success)
+        and cnc_stats (convertor.convert's per file stats) when cnc is an output
+    """
+    result = {"path": path, "output_dir": board_output_dir(path, output_root), "timings": {}, "error": None}
+    timings = result["timings"]
+
+    try:
+        start = time.perf_counter()
+        pcb = PCB(path, cache=LayerCache(cache_dir) if cache_dir else None)
+        timings["load"] = time.perf_counter() - start
+
+        os.makedirs(result["output_dir"], exist_ok=True)
+
+        run_funcs = [MASK_GENERATORS[output] for output in outputs if output in MASK_GENERATORS]
+        if run_funcs:
+            from .gui import generator
+
+            # Same path as the GUI's "Generate All", layers shared between the masks are only formatted once
+            start = time.perf_counter()
+            generator.generate_all(pcb, result["output_dir"], run_funcs)
+            timings["masks"] = time.perf_counter() - start
+
+        if "cnc" in outputs:
+            from .mygerber.cnc import convertor
+
+            start = time.perf_counter()
+            result["cnc_stats"] = convertor.convert(pcb, convertor.Settings, result["output_dir"])
+            timings["cnc"] = time.perf_counter() - start
+
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+
+    return result
+
+
+def format_result(result: dict) -> str:
+    timings = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in result["timings"].items())
+
+    if result["error"] is not None:
+        return f"{result['path']}: FAILED ({result['error']}) [{timings}]"
+
+    return f"{result['path']}: ok in {sum(result['timings'].values()):.2f}s [{timings}] -> {result['output_dir']}"
+
+
+def run_batch(boards: list[str], outputs: list[str], output_root: None | str = None, cache_dir: None | str = DEFAULT_CACHE_DIR, jobs: int = 1) -> list[dict]:
+    """
+    Processes every board, printing a line per board as they finish and a throughput summary at the end.
+
+    :param cache_dir: Parsed layer cache location, None to always parse. Left out if it can't be created
+    :param jobs: Number of worker processes, 1 runs every board in this process
+    :return: list of process_board results, in completion order
+    """
+    if cache_dir is not None:
+        try:
+            LayerCache(cache_dir)
+        except OSError as e:
+            # e.g. a read only or unset home directory, boards can still be processed without the cache
+            print(f"[OpenEtch] Layer cache disabled, can't create {cache_dir} ({e})")
+            cache_dir = None
+
+    results = []
+    start = time.perf_counter()
+
+    def report(result):
+        results.append(result)
+        elapsed = time.perf_counter() - start
+        print(f"[OpenEtch] [{len(results)}/{len(boards)}] {format_result(result)} ({len(results) / elapsed:.2f} boards/sec)", flush=True)
+
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(boards))) as executor:
+            futures = [executor.submit(process_board, board, outputs, output_root, cache_dir) for board in boards]
+
+            for future in as_completed(futures):
+                report(future.result())
+
+    else:
+        for board in boards:
+            report(process_board(board, outputs, output_root, cache_dir))
+
+    elapsed = time.perf_counter() - start
+    failed = sum(result["error"] is not None for result in results)
+
+    print(f"[OpenEtch] {len(results) - failed} succeeded, {failed} failed, {elapsed:.2f}s total ({len(results) / elapsed:.2f} boards/sec)")
+
+    return results
+
+
+def main(argv: None | list[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="OpenEtch", description="Headless batch processing of gerber zips")
+    parser.add_argument("inputs", nargs="+", help="Gerber zips, extracted gerber directories, directories of zips or glob patterns")
+
+    parser.add_argument("--etch", action="store_true", help="Write the etching masks")
+    parser.add_argument("--silk", action="store_true", help="Write the silkscreen masks")
+    parser.add_argument("--cnc", action="store_true", help="Write the CNC g-code (outlines use OpenCL when available, otherwise the CPU)")
+
+    parser.add_argument("-o", "--output-dir", default=None, help="Write every board into <output-dir>/<board name>, default is <board>_output")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="Worker processes (default: cpu count)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Parsed layer cache location")
+    parser.add_argument("--no-cache", action="store_true", help="Always parse layers, never read or fill the cache")
+
+    args = parser.parse_args(argv)
+
+    outputs = [output for output in OUTPUTS if getattr(args, output)]
+    if not outputs:
+        outputs = ["etch", "silk"]  # Same as the default generator_config.json
+
+    boards = collect_inputs(args.inputs)
+    if not boards:
+        parser.error("no gerber zips found")
+
+    print(f"[OpenEtch] {len(boards)} boards, outputs: {', '.join(outputs)}, {min(args.jobs, len(boards))} workers")
+
+    results = run_batch(boards, outputs, args.output_dir, None if args.no_cache else args.cache_dir, max(args.jobs, 1))
+
+    return 1 if any(result["error"] is not None for result in results) else 0
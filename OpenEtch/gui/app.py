@@ -8,7 +8,6 @@ from ..mygerber import PCB
 from ..mygerber.render.renderer import GerberView
 from ..board_vectors import Vectorizer
 
-pygame.init()
 
 class App:
     SETTINGS_BACKGROUND_COLOUR = (30, 30, 30)
@@ -19,6 +18,8 @@ class App:
     VERSION = "0.1"
 
     def __init__(self):
+        pygame.init()
+
         self.w, self.h = 860, 640
         self.running = False
 
@@ -65,6 +66,7 @@ class App:
         output_dir = f"{self.pcb.path}_output"
         os.makedirs(output_dir, exist_ok=True)
 
+        run_funcs = []
         for task in self.generate_all_config:
             data = self.generate_all_config[task]
 
@@ -73,11 +75,13 @@ class App:
                 run_func = data["run_func"]
 
                 if run_func and hasattr(generator, run_func):
-                    getattr(generator, run_func)(self.pcb, output_dir)
+                    run_funcs.append(run_func)
 
             else:
                 print(f"Skipping: {task}")
 
+        generator.generate_all(self.pcb, output_dir, run_funcs)
+
 
 
 
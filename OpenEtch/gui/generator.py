@@ -1,12 +1,35 @@
-from ..board_vectors import Vectorizer
+from concurrent.futures import ThreadPoolExecutor
+
+from ..board_vectors import Vectorizer, ContentCache
 from ..vector_configs import *
 
 
-def generate_etching_mask(pcb, output_dir):
-    v = Vectorizer(pcb, etching_mask)
+def generate_etching_mask(pcb, output_dir, content_cache=None):
+    v = Vectorizer(pcb, etching_mask, content_cache=content_cache)
     v.save(f"{output_dir}/etching_mask.pdf")
 
 
-def generate_silk_mask(pcb, output_dir):
-    v = Vectorizer(pcb, silk_mask)
+def generate_silk_mask(pcb, output_dir, content_cache=None):
+    v = Vectorizer(pcb, silk_mask, content_cache=content_cache)
     v.save(f"{output_dir}/silkscreen_mask.pdf")
+
+
+def generate_all(pcb, output_dir, run_funcs: list[str], workers=4):
+    """
+    Runs several generators for one pcb at once.
+    They share a single content cache, so layers used by more than one output (outline, holes) are only formatted once.
+
+    :param run_funcs: Names of generator functions in this module
+    :param workers: Outputs generated in parallel
+    """
+    content_cache = ContentCache()
+    run_funcs = [globals()[run_func] for run_func in run_funcs]
+
+    if not run_funcs:
+        return
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(run_funcs))) as executor:
+        futures = [executor.submit(run_func, pcb, output_dir, content_cache) for run_func in run_funcs]
+
+        for future in futures:
+            future.result()  # Re-raise any errors from the workers
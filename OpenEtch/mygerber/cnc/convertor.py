@@ -1,41 +1,78 @@
-from .gerber_to_image import convert_gerber_to_image
-from .gpu_path_generator import create_outline
-from .image_to_toolpath import image_to_tool_path
+from .gerber_to_image import convert_gerber_to_image, board_frame, TOP_LAYERS, BOTTOM_LAYERS
+from .outline_backend import create_packed_tool_outline
+from .image_to_toolpath import packed_outline_to_tool_path
+from .tiled_raster import tiled_tool_path, strip_rows
+from .vector_toolpath import layer_to_tool_path
 from .drill_holes import create_gcode_from_pcb as drill_holes_to_path
 from .drill_holes import create_divots
 from .gcode import create_header as create_gcode_header
+from .gcode import GcodeWriter
 from .settings import Settings
+from ..render.renderer import image_size
 
-import math
 import os
 
 
+def raster_tool_paths(pcb, settings: Settings, top_stats=None, bottom_stats=None, top_writer=None, bottom_writer=None):
+    """ Renders the copper, outlines it and traces the outline pixels, in strips when the board image is too large """
+    rows_per_strip = strip_rows(settings, *image_size(board_frame(pcb, settings)[0]))
+
+    if rows_per_strip:
+        return (tiled_tool_path(pcb, settings, TOP_LAYERS, rows_per_strip, top_stats, top_writer),
+                tiled_tool_path(pcb, settings, BOTTOM_LAYERS, rows_per_strip, bottom_stats, bottom_writer))
+
+    top_view, bottom_view = convert_gerber_to_image(pcb, settings)
+
+    # Kept bit packed from the rendered image through to the tracing
+    top_view_outline = create_packed_tool_outline(top_view, settings)
+    bottom_view_outline = create_packed_tool_outline(bottom_view, settings)
+
+    return (packed_outline_to_tool_path(top_view_outline, settings, top_stats, top_writer),
+            packed_outline_to_tool_path(bottom_view_outline, settings, bottom_stats, bottom_writer))
+
+
+def vector_tool_paths(pcb, settings: Settings, top_stats=None, bottom_stats=None, top_writer=None, bottom_writer=None):
+    """ Offsets the parsed copper geometry, resolution independent and no images are allocated """
+    return (layer_to_tool_path(pcb, "TopLayer", settings, top_stats, top_writer),
+            layer_to_tool_path(pcb, "BottomLayer", settings, bottom_stats, bottom_writer))
+
+
 def convert(pcb, settings: Settings, output_path: str="/"):
+    """
+    Writes TopLayer.cnc, BottomLayer.cnc and ThoughHoles.cnc, each streamed to disk as it is generated.
+
+    :return: dict of file name to its stats, MotionModel.stats (moves, cut / travel length, estimated time ...)
+        plus lines, simplification and route optimisation figures
+    """
     gcode_header = create_gcode_header(pcb, settings)
 
-    top_view, bottom_view = convert_gerber_to_image(pcb, settings)
+    stats = {"TopLayer.cnc": {}, "BottomLayer.cnc": {}, "ThoughHoles.cnc": {}}
+
+    def open_writer(file_name):
+        return GcodeWriter(os.path.join(output_path, file_name), gcode_header, settings)
 
-    top_view_outline = create_outline(top_view, round(settings.cutting_tool_width * settings.scale))
-    bottom_view_outline = create_outline(bottom_view, round(settings.cutting_tool_width * settings.scale))
+    with open_writer("TopLayer.cnc") as top_writer, open_writer("BottomLayer.cnc") as bottom_writer:
 
-    top_tool_path = image_to_tool_path(top_view_outline, settings)
-    bottom_tool_path = image_to_tool_path(bottom_view_outline, settings)
+        if settings.toolpath_engine == "vector":
+            vector_tool_paths(pcb, settings, stats["TopLayer.cnc"], stats["BottomLayer.cnc"], top_writer, bottom_writer)
+        else:
+            raster_tool_paths(pcb, settings, stats["TopLayer.cnc"], stats["BottomLayer.cnc"], top_writer, bottom_writer)
 
-    if settings.create_drill_dimples is True:
-        top_tool_path += create_divots(pcb, settings)
+        if settings.create_drill_dimples is True:
+            create_divots(pcb, settings, stats["TopLayer.cnc"], top_writer)
 
-    though_hole_path = drill_holes_to_path(pcb, settings)
+    with open_writer("ThoughHoles.cnc") as though_hole_writer:
+        drill_holes_to_path(pcb, settings, stats["ThoughHoles.cnc"], though_hole_writer)
 
-    top_tool_path = top_tool_path.replace("FILE_TOTAL_LINE_COUNT", str(len(top_tool_path.split("\n")))).replace("ESTIMATED_TIME", "1")
-    bottom_tool_path = bottom_tool_path.replace("FILE_TOTAL_LINE_COUNT", str(len(bottom_tool_path.split("\n")))).replace("ESTIMATED_TIME", "1")
-    though_hole_path = though_hole_path.replace("FILE_TOTAL_LINE_COUNT", str(len(though_hole_path.split("\n")))).replace("ESTIMATED_TIME", "1")
+    writers = {"TopLayer.cnc": top_writer, "BottomLayer.cnc": bottom_writer, "ThoughHoles.cnc": though_hole_writer}
 
-    with open(os.path.join(output_path, "TopLayer.cnc"), "w") as f:
-        f.write(gcode_header + top_tool_path)
+    for file_name, file_stats in stats.items():
+        file_stats.update(writers[file_name].motion.stats(), lines=writers[file_name].line_count)
 
-    with open(os.path.join(output_path, "BottomLayer.cnc"), "w") as f:
-        f.write(gcode_header + bottom_tool_path)
+        if "moves_before" in file_stats:
+            print(f"[Convertor] {file_name}: {file_stats['moves_before']} -> {file_stats['moves_after']} cutting moves after simplification")
+        print(f"[Convertor] {file_name}: {file_stats.get('travel_before', 0):.1f} -> {file_stats.get('travel_after', 0):.1f} mm of travel after route optimisation")
+        print(f"[Convertor] {file_name}: {file_stats['lines']} lines, {file_stats['cut_length']:.1f} mm cut, "
+              f"{file_stats['travel_length']:.1f} mm travel, estimated {file_stats['estimated_time'] / 60:.1f} minutes")
 
-    with open(os.path.join(output_path, "ThoughHoles.cnc"), "w") as f:
-        f.write(gcode_header + though_hole_path)
-    
+    return stats
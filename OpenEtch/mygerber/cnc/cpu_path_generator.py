@@ -0,0 +1,138 @@
+import numpy as np
+from PIL import Image
+
+
+def erode_rows(packed, radius):
+    """
+    Binary erosion along the rows (y axis) of a bit packed image, a pixel stays set only if every pixel
+    within radius rows above and below it is set. Rows past the edges count as set.
+    Each packed byte holds 8 pixels of a row, so shifting by whole rows never needs any bit twiddling.
+
+    Runs are combined by doubling (1, 2, 4... rows), so the cost is O(pixels * log(radius)) rather than O(pixels * radius).
+
+    :param packed: (height, row_bytes) uint8 array
+    :param radius: Rows either side
+    :return: (height, row_bytes) uint8 array
+    """
+    if radius <= 0:
+        return packed
+
+    height = packed.shape[0]
+    window = 2 * radius + 1
+
+    runs = np.pad(packed, ((radius, radius), (0, 0)), constant_values=0xFF)
+    length = 1  # runs[i] = AND of padded rows i .. i + length - 1
+
+    while length * 2 <= window:
+        runs = runs[:-length] & runs[length:]
+        length *= 2
+
+    # Two overlapping runs cover the whole window
+    return runs[:height] & runs[window - length:window - length + height]
+
+
+def shift_columns(packed, shift):
+    """
+    Moves every pixel of a bit packed image along its row, pixel x takes the value of pixel x + shift.
+    Pixels shifted in from past either edge are set.
+
+    :param packed: (height, row_bytes) uint8 array, most significant bit first (PIL's layout)
+    :param shift: Pixels, positive or negative
+    """
+    if shift == 0:
+        return packed
+
+    byte_shift, bit_shift = divmod(abs(shift), 8)
+    height, row_bytes = packed.shape
+    fill = np.full((height, byte_shift + 1), 0xFF, dtype=np.uint8)
+
+    if shift > 0:
+        padded = np.concatenate((packed, fill), axis=1)
+        current, following = padded[:, byte_shift:byte_shift + row_bytes], padded[:, byte_shift + 1:byte_shift + 1 + row_bytes]
+
+        if bit_shift == 0:
+            return current.copy()
+        return (current << bit_shift) | (following >> (8 - bit_shift))
+
+    padded = np.concatenate((fill, packed), axis=1)
+    previous, current = padded[:, :row_bytes], padded[:, 1:row_bytes + 1]
+
+    if bit_shift == 0:
+        return current.copy()
+    return (previous << (8 - bit_shift)) | (current >> bit_shift)
+
+
+def erode_columns(packed, radius):
+    """ erode_rows along the columns (x axis), the bits past the image width must already be set """
+    if radius <= 0:
+        return packed
+
+    window = 2 * radius + 1
+    pad_bytes = (radius + 7) // 8
+
+    # Whole bytes of set pixels either side, so runs starting left of the image still see the pixels inside it
+    runs = np.pad(packed, ((0, 0), (pad_bytes, pad_bytes)), constant_values=0xFF)
+    length = 1  # runs[x] = AND of pixels x .. x + length - 1
+
+    while length * 2 <= window:
+        runs = runs & shift_columns(runs, length)
+        length *= 2
+
+    eroded = shift_columns(runs, -radius) & shift_columns(runs, window - length - radius)
+    return eroded[:, pad_bytes:pad_bytes + packed.shape[1]]
+
+
+def pack_image(img):
+    """
+    Image -> (height, row_bytes) uint8 of its set pixels, 8 pixels per byte, the same layout PIL uses for tobytes().
+    A mode "1" image is packed by PIL directly. The unused bits at the end of each row are set, so they act like the
+    pixels past the edge.
+    """
+    width, height = img.size
+    img = img if img.mode == "1" else img.convert("1")
+    packed = np.frombuffer(img.tobytes(), dtype=np.uint8).reshape(height, (width + 7) // 8).copy()
+
+    if width % 8:
+        packed[:, -1] |= 0xFF >> (width % 8)
+
+    return packed
+
+
+def clear_row_padding(packed, width):
+    """ Clears the unused bits at the end of each packed row, in place """
+    if width % 8:
+        packed[:, -1] &= (0xFF00 >> (width % 8)) & 0xFF
+
+    return packed
+
+
+def erode(packed, radius):
+    """ Square (2 * radius + 1) erosion, the same as radius passes of an 8 neighbour erosion """
+    return erode_columns(erode_rows(packed, radius), radius)
+
+
+def create_packed_outline(img, outline_width):
+    """
+    CPU version of gpu_path_generator.create_outline, producing identical outlines.
+
+    The OpenCL kernel erodes the set (white) pixels by one pixel per pass, and outline_width passes later
+    keeps the set pixels touching an unset neighbour as the outline (black, 0). That is the same as the pixels set
+    after outline_width - 1 erosions but not after outline_width, and as repeated 8 neighbour erosions are a single
+    square erosion, both are found directly on the bit packed image whatever the tool width.
+
+    :return: (height, row_bytes) uint8, bit packed with the outline pixels set, the unused bits of each row clear
+    """
+    packed = pack_image(img)
+
+    if outline_width <= 0:
+        return np.zeros_like(packed)
+
+    inner = erode(packed, outline_width - 1)
+    eroded = erode(inner, 1)
+
+    return clear_row_padding(inner & ~eroded, img.size[0])
+
+
+def create_outline(img, outline_width):
+    """ create_packed_outline as an "L" image, outline pixels black (0) on white """
+    return Image.frombytes("1", img.size, (~create_packed_outline(img, outline_width)).tobytes()).convert("L")
@@ -1,32 +1,62 @@
 from .settings import Settings
-from .gcode import CNC_Gcode
+from .gcode import CNC_Gcode, GcodeWriter
+from .route import optimise_order, route_length
 
+import numpy as np
 import math
 
 
-def create_divots(pcb, settings):
-    gcode = CNC_Gcode(settings)
+HOLE_LAYERS = ["Vias", "NoPlateThoughHole", "PlatedThoughHole"]
 
-    hole_layers = ["Vias", "NoPlateThoughHole", "PlatedThoughHole"]
-    height = pcb.max_xy[1] - pcb.min_xy[1]
 
-    for layer_name in pcb:
-        layer = pcb.get_component(layer_name)
+def board_holes(pcb):
+    """
+    Every hole on the board, from all the hole layers together as there is only the one drill tool.
+
+    :return: xs, ys, diameters arrays, in board mm
+    """
+    holes = [pcb.get_component(layer_name).geometry.holes for layer_name in pcb if layer_name in HOLE_LAYERS]
+
+    if not holes:
+        return np.zeros(0), np.zeros(0), np.zeros(0)
+
+    holes = np.concatenate(holes)
+    return holes["x"], holes["y"], holes["diameter"]
+
+
+def order_holes(xs, ys, stats: None | dict = None) -> list[int]:
+    """
+    Shortest route found through the holes, starting at the origin.
+
+    :param stats: Optional dict, "travel_before" / "travel_after" (file order vs optimised, mm) are added to it
+    """
+    points = np.stack((xs, ys), axis=1)
+    order = optimise_order(points)
+
+    if stats is not None:
+        stats["travel_before"] = stats.get("travel_before", 0) + route_length(points)
+        stats["travel_after"] = stats.get("travel_after", 0) + route_length(points[order])
+
+    return order
 
-        if layer_name in hole_layers:
-            for command in layer.commands:
-                if command[0] == "hole":
-                    x, y, diameter = command[1:]
 
-                    x, y = x * settings.scale, (height - y) * settings.scale
+def create_divots(pcb, settings, stats: None | dict = None, writer: None | GcodeWriter = None):
+    """ :param stats: Optional dict, see order_holes. :param writer: Optional GcodeWriter to stream to """
+    gcode = CNC_Gcode(settings, writer=writer)
+    height = pcb.max_xy[1] - pcb.min_xy[1]
+
+    xs, ys, _ = board_holes(pcb)
+    xs, ys = xs * settings.scale, (height - ys) * settings.scale
 
-                    gcode.go_to(x, y, settings.travel_height)
+    for i in order_holes(xs / settings.scale, ys / settings.scale, stats):
+        x, y = xs[i].item(), ys[i].item()
+        gcode.go_to(x, y, settings.travel_height)
 
-                    gcode.spin()
-                    gcode.cut_to(x, y, -0.1)
-                    gcode.stop()
+        gcode.spin()
+        gcode.cut_to(x, y, -0.1)
+        gcode.stop()
 
-                    gcode.go_to(x, y,  settings.travel_height)
+        gcode.go_to(x, y,  settings.travel_height)
 
     return gcode.gcode
 
@@ -42,59 +72,50 @@ def cut_circle(gcode, x, y, z, r, res=20):
 
 
 
-def create_gcode_from_layer(gcode, height, layer, settings: Settings):
-    drill_radius_half = settings.drill_tool_width / 4
-    for command in layer.commands:
-        if command[0] == "hole":
-            x, y, diameter = command[1:]
-
-            x, y = x * settings.scale, (height-y-drill_radius_half) * settings.scale
-
-            if diameter <= settings.drill_tool_width:
-                if diameter < settings.drill_tool_width:
-                    print("[WARNING] Though hole / drill tool too large for hole")
+def drill_hole(gcode, x, y, diameter, settings: Settings):
+    if diameter <= settings.drill_tool_width:
+        if diameter < settings.drill_tool_width:
+            print("[WARNING] Though hole / drill tool too large for hole")
 
-                gcode.go_to(x, y, settings.travel_height)
+        gcode.go_to(x, y, settings.travel_height)
 
-                gcode.spin()
-                gcode.go_to(x, y, 1)
+        gcode.spin()
+        gcode.go_to(x, y, 1)
 
-                for i in range(0, math.floor(settings.cut_though_height), -1):
-                    gcode.cut_to(x, y, i)
-                    gcode.go_to(x, y, 1)
+        for i in range(0, math.floor(settings.cut_though_height), -1):
+            gcode.cut_to(x, y, i)
+            gcode.go_to(x, y, 1)
 
 
-                gcode.stop()
-                gcode.go_to(x, y, settings.travel_height)
+        gcode.stop()
+        gcode.go_to(x, y, settings.travel_height)
 
-            else:
-                gcode.go_to(x, y, settings.travel_height)
+    else:
+        gcode.go_to(x, y, settings.travel_height)
 
-                gcode.spin()
-                gcode.go_to(x, y, 1)
+        gcode.spin()
+        gcode.go_to(x, y, 1)
 
-                for h in range(0, math.floor(settings.cut_though_height), -1):
-                    for sub_radius in range(0, math.floor(((diameter-settings.drill_tool_width)*settings.scale)/2), math.floor((settings.drill_tool_width * settings.scale)/2)):
-                        cut_circle(gcode, x, y, h, sub_radius)
+        for h in range(0, math.floor(settings.cut_though_height), -1):
+            for sub_radius in range(0, math.floor(((diameter-settings.drill_tool_width)*settings.scale)/2), math.floor((settings.drill_tool_width * settings.scale)/2)):
+                cut_circle(gcode, x, y, h, sub_radius)
 
-                    cut_circle(gcode, x, y, h, (diameter*settings.scale-settings.drill_tool_width)/2)
+            cut_circle(gcode, x, y, h, (diameter*settings.scale-settings.drill_tool_width)/2)
 
-                gcode.stop()
-                gcode.go_to(x, y, settings.travel_height)
+        gcode.stop()
+        gcode.go_to(x, y, settings.travel_height)
 
 
-def create_gcode_from_pcb(pcb, settings: Settings):
-    gcode = CNC_Gcode(settings)
+def create_gcode_from_pcb(pcb, settings: Settings, stats: None | dict = None, writer: None | GcodeWriter = None):
+    """ :param stats: Optional dict, see order_holes. :param writer: Optional GcodeWriter to stream to """
+    gcode = CNC_Gcode(settings, writer=writer)
     height = pcb.max_xy[1] - pcb.min_xy[1]
+    drill_radius_half = settings.drill_tool_width / 4
 
-    hole_layers = ["Vias", "NoPlateThoughHole", "PlatedThoughHole"]
-
-    for layer_name in pcb:
-        layer = pcb.get_component(layer_name)
+    xs, ys, diameters = board_holes(pcb)
+    xs, ys = xs * settings.scale, (height - ys - drill_radius_half) * settings.scale
 
-        if layer_name in hole_layers:
-            create_gcode_from_layer(gcode, height, layer, settings)
+    for i in order_holes(xs / settings.scale, ys / settings.scale, stats):
+        drill_hole(gcode, xs[i].item(), ys[i].item(), diameters[i].item(), settings)
 
     return gcode.gcode
-
-
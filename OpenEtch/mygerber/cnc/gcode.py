@@ -1,4 +1,13 @@
 from .settings import Settings
+from .motion import MotionModel
+
+import numpy as np
+import math
+import re
+
+
+HEADER_FIELDS = ["FILE_TOTAL_LINE_COUNT", "ESTIMATED_TIME"]  # Placeholders in create_header, filled in by GcodeWriter.close
+WRITER_CHUNK_LINES = 4096
 
 
 def create_header(pcb, settings: Settings):
@@ -34,23 +43,244 @@ def create_header(pcb, settings: Settings):
     ; G-code START <<<"""
 
 
-class CNC_Gcode:
+class GcodeFormatter:
+    """
+    Turns moves into G-code lines with fixed precision numbers. It remembers the last value written for each word,
+    so (with settings.gcode_modal) unchanged X / Y / Z / F words are left off and moves that go nowhere are skipped.
+    """
     def __init__(self, settings: Settings):
+        self.decimals = settings.gcode_decimals
+        self.strip_zeros = settings.gcode_strip_zeros and settings.gcode_decimals > 0
+        self.modal = settings.gcode_modal
+        self.modal_motion = settings.gcode_modal_motion
+
+        self.last = {}  # Letter -> last value written
+        self.negative_zero = f"{-0.0:.{self.decimals}f}"  # Small negatives round to this, written as 0 instead
+
+    def number(self, value) -> str:
+        text = f"{value:.{self.decimals}f}"
+        if text == self.negative_zero:
+            text = text[1:]
+
+        return text.rstrip("0").rstrip(".") if self.strip_zeros else text
+
+    def numbers(self, values: np.ndarray) -> np.ndarray:
+        """ number for a whole array at once, giving the same text """
+        text = np.char.mod(f"%.{self.decimals}f", np.asarray(values, dtype=np.float64))
+        text = np.where(text == self.negative_zero, self.negative_zero[1:], text)
+
+        return np.char.rstrip(np.char.rstrip(text, "0"), ".") if self.strip_zeros else text
+
+    def __changed(self, words: dict) -> list[str]:
+        return [letter + text for letter, text in words.items() if not self.modal or self.last.get(letter) != text]
+
+    def __line(self, g: str, words: list[str]) -> str:
+        command = "" if self.modal_motion and self.last.get("G") == g else g
+        self.last["G"] = g
+
+        return " ".join([command] + words) if command else " ".join(words)
+
+    def move(self, g: str, x, y, z, feed) -> None | str:
+        """ G00 / G01 line, None if nothing would move """
+        words = {"X": self.number(x), "Y": self.number(y), "Z": self.number(z), "F": self.number(feed)}
+        written = self.__changed(words)
+
+        if self.modal and not any(word[0] in "XYZ" for word in written):
+            return None  # A feed change alone waits for the next move
+
+        self.last.update(words)
+        return self.__line(g, written)
+
+    def arc(self, g: str, x, y, i, j, z, feed) -> str:
+        """ G02 / G03 line, X Y I J are always written """
+        words = {"Z": self.number(z), "F": self.number(feed)}
+        written = [f"X{self.number(x)}", f"Y{self.number(y)}", f"I{self.number(i)}", f"J{self.number(j)}"] + self.__changed(words)
+
+        self.last.update(words, X=written[0][1:], Y=written[1][1:])
+        return self.__line(g, written)
+
+    def polyline(self, g: str, xs: np.ndarray, ys: np.ndarray, z, feed) -> list[str]:
+        """ move to each point in turn, the points after the first are formatted all at once """
+        if len(xs) == 0:
+            return []
+
+        # The first point can also change Z / F, after that only X and Y move
+        first = self.move(g, xs[0], ys[0], z, feed)
+        lines = [] if first is None else [first]
+
+        if len(xs) == 1:
+            return lines
+
+        x_text, y_text = self.numbers(xs), self.numbers(ys)
+
+        if self.modal:
+            x_words = np.where(x_text[1:] != x_text[:-1], np.char.add(" X", x_text[1:]), "")
+            y_words = np.where(y_text[1:] != y_text[:-1], np.char.add(" Y", y_text[1:]), "")
+            rest = np.char.add(x_words, y_words)
+            rest = rest[np.char.str_len(rest) > 0].tolist()  # Points that round onto the one before are dropped
+        else:
+            rest = np.char.add(np.char.add(np.char.add(" X", x_text[1:]), " Y"), y_text[1:])
+            rest = [f"{line} Z{self.number(z)} F{self.number(feed)}" for line in rest.tolist()]
+
+        if rest:
+            if self.modal_motion:
+                lines.append(self.__line(g, [rest[0][1:]]))
+                lines.extend(line[1:] for line in rest[1:])
+            else:
+                lines.extend(g + line for line in rest)
+
+            self.last.update(X=str(x_text[-1]), Y=str(y_text[-1]))
+
+        return lines
+
+
+class GcodeWriter:
+    """
+    Streams a G-code program to a file in chunks of lines, so the whole program is never held in memory.
+    The header's line count and estimated time are only known once every line is written, so space is reserved
+    for them in the header and they are written into it on close.
+
+    Every CNC_Gcode streaming to a writer shares its MotionModel (the time estimate) and GcodeFormatter (modal state).
+    """
+    def __init__(self, path: str, header: str, settings: Settings, chunk_lines: int = WRITER_CHUNK_LINES):
+        self.file = open(path, "w")
+        self.chunk = []
+        self.chunk_lines = chunk_lines
+        self.line_count = header.count("\n") + 1
+        self.motion = MotionModel(settings)
+        self.formatter = GcodeFormatter(settings)
+
+        # Placeholders are swapped for blanks of the same width, remembering where each one is
+        self.fields = {}
+        written = 0
+        for match in re.finditer("|".join(HEADER_FIELDS), header):
+            self.file.write(header[written:match.start()])
+            self.fields[match.group()] = self.file.tell(), len(match.group())
+            self.file.write(" " * len(match.group()))
+            written = match.end()
+
+        self.file.write(header[written:])
+
+    def write_line(self, line: str):
+        self.chunk.append(line)
+        self.line_count += 1
+
+        if len(self.chunk) >= self.chunk_lines:
+            self.flush()
+
+    def write_lines(self, lines: list[str]):
+        self.chunk.extend(lines)
+        self.line_count += len(lines)
+
+        if len(self.chunk) >= self.chunk_lines:
+            self.flush()
+
+    def flush(self):
+        if self.chunk:
+            self.file.write("\n" + "\n".join(self.chunk))
+            self.chunk.clear()
+
+    def close(self):
+        self.flush()
+
+        values = {"FILE_TOTAL_LINE_COUNT": self.line_count, "ESTIMATED_TIME": math.ceil(self.motion.time)}
+        for field, (position, width) in self.fields.items():
+            value = str(values[field])
+            if len(value) > width:
+                raise Exception(f"[GcodeWriter] {field} value {value} does not fit the {width} characters reserved for it")
+
+            self.file.seek(position)
+            self.file.write(value.ljust(width))
+
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.file.close()
+
+
+class CNC_Gcode:
+    def __init__(self, settings: Settings, scale=None, writer: None | GcodeWriter = None):
+        """
+        :param scale: Units per mm of the positions given to go_to / cut_to, defaults to settings.scale (image pixels)
+        :param writer: Streams lines straight to its file, otherwise they are kept for .gcode
+        """
         self.settings = settings
-        self.gcode = ""
+        self.scale = settings.scale if scale is None else scale
+        self.writer = writer
+        self.motion = writer.motion if writer is not None else MotionModel(settings)
+        self.formatter = writer.formatter if writer is not None else GcodeFormatter(settings)
+        self.lines = []
 
+    @property
+    def gcode(self) -> str:
+        """ Every line kept so far, each starting with a newline. Empty when streaming to a writer """
+        return "".join(f"\n{line}" for line in self.lines)
+
+    def write_line(self, line: str):
+        if self.writer is not None:
+            self.writer.write_line(line)
+        else:
+            self.lines.append(line)
+
+    def write_lines(self, lines: list[str]):
+        if self.writer is not None:
+            self.writer.write_lines(lines)
+        else:
+            self.lines.extend(lines)
 
     def go_to(self, x, y, z):
-        self.gcode += f"\nG00 X{x/self.settings.scale} Y{y/self.settings.scale} Z{z} F{self.settings.travel_speed}"
+        line = self.formatter.move("G00", x / self.scale, y / self.scale, z, self.settings.travel_speed)
+        if line is not None:
+            self.motion.line(x / self.scale, y / self.scale, z, self.settings.travel_speed, cutting=False)
+            self.write_line(line)
 
     def cut_to(self, x, y, z):
-        self.gcode += f"\nG01 X{x/self.settings.scale} Y{y/self.settings.scale} Z{z} F{self.settings.cut_speed}"
+        line = self.formatter.move("G01", x / self.scale, y / self.scale, z, self.settings.cut_speed)
+        if line is not None:
+            self.motion.line(x / self.scale, y / self.scale, z, self.settings.cut_speed)
+            self.write_line(line)
+
+    def cut_polyline(self, points, z):
+        """ cut_to each (x, y) in turn, formatted in one go """
+        if len(points) == 0:
+            return
+
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2) / self.scale
+        self.write_lines(self.formatter.polyline("G01", points[:, 0], points[:, 1], z, self.settings.cut_speed))
+        self.motion.polyline(points[:, 0], points[:, 1], z, self.settings.cut_speed)
+
+    def arc_to(self, x, y, i, j, z, clockwise=True):
+        """ G02 / G03, i and j are the centre relative to the current position """
+        g = "G02" if clockwise else "G03"
+        self.motion.arc(x / self.scale, y / self.scale, i / self.scale, j / self.scale, z, self.settings.cut_speed, clockwise)
+        self.write_line(self.formatter.arc(g, x / self.scale, y / self.scale, i / self.scale, j / self.scale, z, self.settings.cut_speed))
+
+    def cut_path(self, moves, z):
+        """ Cuts along simplify.simplify_path moves, (x, y) lines and (x, y, i, j, clockwise) arcs """
+        run = []
+        for move in moves:
+            if len(move) == 2:
+                run.append(move)
+            else:
+                self.cut_polyline(run, z)
+                run = []
+                self.arc_to(*move[:4], z, clockwise=move[4])
+
+        self.cut_polyline(run, z)
 
     def spin(self, clockwise=True):
+        self.motion.spin()
         if clockwise:
-            self.gcode += f"\nM03 S{self.settings.spinal_rpm}"
+            self.write_line(f"M03 S{self.settings.spinal_rpm}")
         else:
-            self.gcode += f"\nM04 S{self.settings.spinal_rpm}"
+            self.write_line(f"M04 S{self.settings.spinal_rpm}")
 
     def stop(self):
-        self.gcode += "\nM05"
\ No newline at end of file
+        self.motion.stop()
+        self.write_line("M05")
\ No newline at end of file
@@ -3,7 +3,13 @@ from ..render import renderer, blank
 
 import math
 
-def convert_gerber_to_image(pcb, settings: Settings):
+
+TOP_LAYERS = ["TopLayer"]
+BOTTOM_LAYERS = ["BottomLayer"]
+
+
+def board_frame(pcb, settings: Settings):
+    """ :return: (shape, offset) for a GerberView covering the board outline at settings.scale """
     if math.inf in pcb.max_xy or math.inf in pcb.min_xy or -math.inf in pcb.max_xy or -math.inf in pcb.min_xy:
         raise Exception(f"Can't convert pcb, min/max positions contain a 'inf'. (You dont have enough memory)")
 
@@ -12,21 +18,23 @@ def convert_gerber_to_image(pcb, settings: Settings):
 
     shape = (math.ceil((outline.max_xy[0] - outline.min_xy[0]) * settings.scale), math.ceil((outline.max_xy[1] - outline.min_xy[1]) * settings.scale))
 
-    view_top = renderer.GerberView(shape, False, 1, settings.scale, offset)
-    view_bottom = renderer.GerberView(shape, False, 1, settings.scale, offset)
+    return shape, offset
 
-    top_layers = ["TopLayer"]
-    bottom_layers = ["BottomLayer"]
+
+def create_view(pcb, settings: Settings, layer_names: list[str], rows=None):
+    """ :param rows: Optional (first, end) rows of the image, see GerberView """
+    shape, offset = board_frame(pcb, settings)
+    view = renderer.GerberView(shape, False, 1, settings.scale, offset, rows)
 
     for layer_name in pcb:
-        layer = pcb.get_component(layer_name)
+        if layer_name in layer_names:
+            view.add_layer(pcb.get_component(layer_name), 0)
 
-        if layer_name in top_layers:
-            view_top.add_layer(layer, 0)
+    return view
 
-        if layer_name in bottom_layers:
-            view_bottom.add_layer(layer, 0)
 
-    view_top.show()
-    return view_top.image, view_bottom.image
+def convert_gerber_to_image(pcb, settings: Settings):
+    view_top = create_view(pcb, settings, TOP_LAYERS)
+    view_bottom = create_view(pcb, settings, BOTTOM_LAYERS)
 
+    return view_top.image, view_bottom.image
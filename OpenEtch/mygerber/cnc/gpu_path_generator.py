@@ -1,28 +1,9 @@
-import pyopencl as cl
+from functools import lru_cache
 import numpy as np
 from PIL import Image
 
 
-platforms = cl.get_platforms()
-devices = platforms[0].get_devices()
-context = cl.Context(devices)
-queue = cl.CommandQueue(context, devices[0])
-
-
-def create_outline(img, outline_width):
-    img_copy = img.convert("1")
-
-    width, height = img_copy.size
-
-    img_data = np.array(img_copy, dtype=np.uint8)
-    outline_data = np.ones_like(img_data, dtype=np.uint8)
-
-    img1_buffer = cl.Buffer(context, cl.mem_flags.READ_ONLY | cl.mem_flags.COPY_HOST_PTR, hostbuf=img_data)
-    img2_buffer = cl.Buffer(context, cl.mem_flags.READ_WRITE | cl.mem_flags.COPY_HOST_PTR, hostbuf=img_data)
-    outline_buffer = cl.Buffer(context, cl.mem_flags.READ_WRITE, outline_data.nbytes, hostbuf=None)
-
-
-    program_src = """
+OUTLINE_KERNEL_SRC = """
 __kernel void create_outline(
     __global const uchar *img,
     __global uchar *img_next,
@@ -60,8 +41,69 @@ __kernel void create_outline(
     outline[idx] = 1;
 }
 
+"""
+
+
+@lru_cache(maxsize=None)
+def get_opencl():
+    """
+    Imports pyopencl and creates the context / queue on first use, rather than when this module is imported.
+    Machines without pyopencl or an OpenCL driver can still import the CNC package.
+
+    :return: (pyopencl module, context, queue)
     """
-    program = cl.Program(context, program_src).build()
+    try:
+        import pyopencl as cl
+    except ImportError as e:
+        raise Exception("pyopencl is needed to create outlines, pip install pyopencl") from e
+
+    try:
+        platforms = cl.get_platforms()
+    except cl.Error:  # Raised rather than returning [] when there is no ICD loader
+        platforms = []
+
+    if not platforms:
+        raise Exception("No OpenCL platforms found, install an OpenCL driver (ICD) to create outlines")
+
+    devices = platforms[0].get_devices()
+    context = cl.Context(devices)
+    queue = cl.CommandQueue(context, devices[0])
+
+    return cl, context, queue
+
+
+def is_available() -> bool:
+    """ True if pyopencl is installed and there is an OpenCL device to run on """
+    try:
+        get_opencl()
+    except Exception:
+        return False
+
+    return True
+
+
+@lru_cache(maxsize=None)
+def get_program():
+    """ Outline kernel, built once per process """
+    cl, context, _ = get_opencl()
+    return cl.Program(context, OUTLINE_KERNEL_SRC).build()
+
+
+def outline_pixels(img, outline_width):
+    """ Runs the kernel, :return: (height, width) uint8, 0 on the outline and 1 elsewhere """
+    cl, context, queue = get_opencl()
+    program = get_program()
+
+    img_copy = img.convert("1")
+
+    width, height = img_copy.size
+
+    img_data = np.array(img_copy, dtype=np.uint8)
+    outline_data = np.ones_like(img_data, dtype=np.uint8)
+
+    img1_buffer = cl.Buffer(context, cl.mem_flags.READ_ONLY | cl.mem_flags.COPY_HOST_PTR, hostbuf=img_data)
+    img2_buffer = cl.Buffer(context, cl.mem_flags.READ_WRITE | cl.mem_flags.COPY_HOST_PTR, hostbuf=img_data)
+    outline_buffer = cl.Buffer(context, cl.mem_flags.READ_WRITE, outline_data.nbytes, hostbuf=None)
 
     for i in range(outline_width):
         program.create_outline(queue, (width, height), None, img1_buffer, img2_buffer, outline_buffer, np.int32(width),
@@ -70,6 +112,16 @@ __kernel void create_outline(
         cl.enqueue_copy(queue, img1_buffer, img2_buffer)
 
     cl.enqueue_copy(queue, outline_data, outline_buffer).wait()
-    outline_copy = Image.fromarray(outline_data.astype(np.uint8) * 255)
+
+    return outline_data
+
+
+def create_outline(img, outline_width):
+    outline_copy = Image.fromarray(outline_pixels(img, outline_width).astype(np.uint8) * 255)
 
     return outline_copy
+
+
+def create_packed_outline(img, outline_width):
+    """ The kernel works a byte per pixel, its result is packed straight from the buffer without an image in between """
+    return np.packbits(outline_pixels(img, outline_width) == 0, axis=1)
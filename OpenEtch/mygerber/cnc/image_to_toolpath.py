@@ -1,153 +1,187 @@
 from .settings import Settings
-from .gcode import CNC_Gcode
+from .gcode import CNC_Gcode, GcodeWriter
+from .simplify import simplify_path, simplify_tolerance
+from .route import optimise_loop_order, loop_route_length, rotate_loop
+from .cpu_path_generator import pack_image, clear_row_padding
 
-from collections import deque
-import math
+import numpy as np
 
-def order_loop_path(pixels):
-    if not pixels:
-        return []
 
-    pixel_set = set(pixels)
-    visited = set()
-    path = [pixels[0]]
-    visited.add(pixels[0])
+# Moore neighbourhood, clockwise (image y points down) starting from west
+DIRECTIONS = [(-1, 0), (-1, -1), (0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1)]
 
-    def get_neighbors(p):
-        x, y = p
-        return [(x + dx, y + dy) for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]]
+# After stepping in direction k, the last background pixel checked (k - 1) is in this direction from the new pixel
+BACKTRACK = [DIRECTIONS.index((DIRECTIONS[k - 1][0] - dx, DIRECTIONS[k - 1][1] - dy)) for k, (dx, dy) in enumerate(DIRECTIONS)]
 
-    def direction(a, b):
-        return (b[0] - a[0], b[1] - a[1])
 
-    def similarity(dir1, dir2):
-        return dir1[0] * dir2[0] + dir1[1] * dir2[1]
+SCAN_ROWS = 256  # Rows unpacked at a time while looking for the next loop to trace
 
-    prev_dir = None
+
+def trace_boundary(foreground, start, row_width):
+    """
+    Moore neighbour tracing of the outer boundary of the component containing start, stopping on Jacob's criterion
+    (back at the start about to make the first move again).
+
+    :param foreground: Bit packed padded image (see pad_foreground), set bits are dark pixels
+    :param start: Flat bit index of the component's first pixel in scan order, so everything west of it is background
+    :param row_width: Bits per padded row
+    :return: list of flat indices, a closed loop (ends on start) unless the component is a single pixel
+    """
+    offsets = [dy * row_width + dx for dx, dy in DIRECTIONS]
+
+    path = [start]
+    current = start
+    backtrack = 0  # West of the start is background
+    first_move = None
 
     while True:
-        current = path[-1]
-        neighbors = [n for n in get_neighbors(current) if n in pixel_set]
+        for i in range(1, 9):
+            direction = (backtrack + i) % 8
+            neighbour = current + offsets[direction]
+            if foreground[neighbour >> 3] & (128 >> (neighbour & 7)):
+                break
+        else:
+            return path  # Isolated pixel
 
-        if not neighbors:
-            break
+        if current == start and direction == first_move:
+            return path
 
-        if len(path) > (len(pixel_set) * 2):
-            return [(0, 0)] # raise Exception("Tool is too big for this")
+        if first_move is None:
+            first_move = direction
 
-        # Prioritize unvisited first
-        unvisited_neighbors = [n for n in neighbors if n not in visited]
+        current = neighbour
+        backtrack = BACKTRACK[direction]
+        path.append(current)
 
-        candidates = unvisited_neighbors if unvisited_neighbors else neighbors
 
-        if not candidates:
-            break
+def padding_bytes(clear_radius) -> int:
+    """ Background bytes either side of every packed row, at least clear_radius pixels """
+    return (clear_radius + 7) // 8
 
-        if prev_dir:
-            candidates.sort(key=lambda n: -similarity(prev_dir, direction(current, n)))
 
-        next_pixel = candidates[0]
-        path.append(next_pixel)
-        visited.add(next_pixel)
-        prev_dir = direction(current, next_pixel)
+def pad_foreground(packed: np.ndarray, clear_radius) -> bytearray:
+    """
+    Bit packed dark pixels (8 pixels per byte, most significant first) as a bytearray, padded with background by
+    clear_radius rows above and below and padding_bytes either side of each row.
+    """
+    pad = padding_bytes(clear_radius)
+    return bytearray(np.pad(packed, ((clear_radius, clear_radius), (pad, pad))).tobytes())
 
-        if next_pixel == path[0] and len(path) > 5:
-            break
 
-    return path
+def trace_packed_loops(foreground: bytearray, row_bytes, clear_radius=1):
+    """
+    trace_loops on an already packed foreground, from pad_foreground or built up a strip at a time.
+    Pixels are cleared from the foreground as they are covered.
 
+    :param row_bytes: Bytes per padded row
+    :return: (loops, centres), in image pixels (the padding removed)
+    """
+    row_width = row_bytes * 8
+    pad_x = padding_bytes(clear_radius) * 8
 
-def group_sections(outline):
-    pixels = outline.load()
-    width, height = outline.size
-    visited = set()
-    groups = []
-    group_centers = []
+    foreground_view = np.frombuffer(foreground, dtype=np.uint8)  # Shares memory, for clearing whole loops at once
+    rows = foreground_view.reshape(-1, row_bytes)
 
-    def neighbors(x, y):
-        for dx in [-1, 0, 1]:
-            for dy in [-1, 0, 1]:
-                if dx == 0 and dy == 0:
-                    continue
-                nx, ny = x + dx, y + dy
-                if 0 <= nx < width and 0 <= ny < height:
-                    yield (nx, ny)
+    span = range(-clear_radius, clear_radius + 1)
+    neighbourhood = np.array([dy * row_width + dx for dy in span for dx in span])
 
-    def dfs(start_x, start_y):
-        x_total = 0
-        y_total = 0
+    loops = []
+    centres = []
 
-        stack = deque([(start_x, start_y)])
-        group = []
+    for first_row in range(0, len(rows), SCAN_ROWS):
+        # Only a few rows are unpacked at once, as later rows are found pixels may have been cleared, which is checked anyway
+        starts = np.flatnonzero(np.unpackbits(rows[first_row:first_row + SCAN_ROWS], axis=1)) + first_row * row_width
 
-        while stack:
-            x, y = stack.pop()
-            if (x, y) in visited:
-                continue
+        for start in starts.tolist():
+            if not foreground[start >> 3] & (128 >> (start & 7)):
+                continue  # Already covered by an earlier loop
 
-            x_total += x
-            y_total += y
-            visited.add((x, y))
-            group.append((x, y))
+            path = np.array(trace_boundary(foreground, start, row_width))
 
-            for nx, ny in neighbors(x, y):
-                if pixels[nx, ny] == 0 and (nx, ny) not in visited:
-                    stack.append((nx, ny))
+            covered = (path[:, None] + neighbourhood).ravel()
+            np.bitwise_and.at(foreground_view, covered >> 3, (0xFF ^ (128 >> (covered & 7))).astype(np.uint8))
 
-        if len(group) == 0:
-            return [], (-1, -1)
+            ys, xs = np.divmod(path, row_width)
+            xs, ys = xs - pad_x, ys - clear_radius  # Remove the padding
 
-        return group, (x_total / len(group), y_total / len(group))
+            loops.append(list(zip(xs.tolist(), ys.tolist())))
+            centres.append((xs.mean().item(), ys.mean().item()))
 
-    for y in range(height):
-        for x in range(width):
-            if pixels[x, y] == 0 and (x, y) not in visited:
-                group, center = dfs(x, y)
-                if group:
-                    groups.append(group)
-                    group_centers.append(center)
+    return loops, centres
 
-    return groups, group_centers
 
+def trace_loops(outline, clear_radius=1):
+    """
+    Ordered closed loops covering every dark pixel of an outline image, in one scan.
 
+    Each dark component is traced around its outer boundary. Pixels within clear_radius of a traced loop are cleared,
+    as the tool cutting the loop covers them, anything left over (e.g. the bar of a figure 8) is found later in the scan
+    and traced as its own loop. Every pixel is scanned once and cleared once, so the cost is O(pixels).
+    The image is held bit packed while tracing, 1 bit per pixel.
+
+    :param outline: "L" / "1" image, dark (0) pixels are to be cut
+    :param clear_radius: Pixels, normally the tool radius
+    :return: (loops, centres), loops are lists of (x, y) pixels, centres the mean (x, y) of each loop
+    """
+    return trace_packed_outline(clear_row_padding(~pack_image(outline), outline.size[0]), clear_radius)
 
-def image_to_tool_path(outline, settings: Settings):
-    print("Generating Tool path", end="")
-    gcode = CNC_Gcode(settings)
-    groups, centers = group_sections(outline)
 
-    x, y = 0, 0
-    while len(groups) > 0:
-        distance_squared = math.inf
-        group_index = 0
+def trace_packed_outline(packed: np.ndarray, clear_radius=1):
+    """ trace_loops for a bit packed outline, as from outline_backend.create_packed_tool_outline """
+    row_bytes = packed.shape[1] + 2 * padding_bytes(clear_radius)
+    return trace_packed_loops(pad_foreground(packed, clear_radius), row_bytes, clear_radius)
 
-        for i in range(len(groups)):
-            group_dist = (x-centers[i][0]) ** 2 + (y-centers[i][1]) ** 2
 
-            if group_dist < distance_squared:
-                distance_squared = group_dist
-                group_index = i
+def tool_clear_radius(settings: Settings) -> int:
+    """ Pixels either side of a traced loop the tool covers, see trace_loops """
+    return max(1, round(settings.cutting_tool_width * settings.scale / 2))
 
-        centers.pop(group_index)
-        group = groups.pop(group_index)
 
+def image_to_tool_path(outline, settings: Settings, stats: None | dict = None, writer: None | GcodeWriter = None):
+    """ Traces an outline image, then loops_to_tool_path """
+    groups, _ = trace_loops(outline, tool_clear_radius(settings))
+    return loops_to_tool_path(groups, settings, stats, writer)
 
-        print(f"\rOrdering Pixels for Group: {group_index} ({len(group)} Pixels) ({len(groups)} Left)", end="")
 
-        pixels = order_loop_path(group)
+def packed_outline_to_tool_path(packed, settings: Settings, stats: None | dict = None, writer: None | GcodeWriter = None):
+    """ image_to_tool_path for a bit packed outline """
+    groups, _ = trace_packed_outline(packed, tool_clear_radius(settings))
+    return loops_to_tool_path(groups, settings, stats, writer)
 
-        print(f"\rCreating tool path for Group: {group_index} ({len(groups)} Left)", end="")
 
-        start = pixels[-1]
+def loops_to_tool_path(groups, settings: Settings, stats: None | dict = None, writer: None | GcodeWriter = None):
+    """
+    :param groups: Closed loops of image pixels, from trace_loops
+    :param stats: Optional dict, "moves_before" / "moves_after" simplification and "travel_before" / "travel_after"
+        route optimisation (mm) are added to it
+    :param writer: Optional GcodeWriter to stream the moves to, the returned str is then empty
+    """
+    print("Generating Tool path", end="")
+    gcode = CNC_Gcode(settings, writer=writer)
+    tolerance = simplify_tolerance(settings, settings.scale)
+    stats = {} if stats is None else stats
+
+    route = optimise_loop_order(groups)
+    stats["travel_before"] = stats.get("travel_before", 0) + loop_route_length(groups) / settings.scale
+    stats["travel_after"] = stats.get("travel_after", 0) + loop_route_length(groups, route) / settings.scale
+
+    for count, (group_index, entry) in enumerate(route):
+        pixels = rotate_loop(groups[group_index], entry)
+
+        print(f"\rCreating tool path for Group: {group_index} ({len(route) - count - 1} Left)", end="")
+
+        start = pixels[0]
         gcode.go_to(start[0], start[1], settings.travel_height)
         gcode.spin()
 
-        for x, y in pixels:
-            gcode.cut_to(x, y, settings.cut_height)
+        moves = simplify_path(pixels, tolerance, settings.fit_arcs) if settings.simplify_paths else pixels
+        stats["moves_before"] = stats.get("moves_before", 0) + len(pixels)
+        stats["moves_after"] = stats.get("moves_after", 0) + len(moves)
+
+        gcode.cut_path(moves, settings.cut_height)
 
         gcode.stop()
         gcode.go_to(start[0], start[1], settings.travel_height)
-        x, y = start
 
     print("\n")
-    return gcode.gcode
\ No newline at end of file
+    return gcode.gcode
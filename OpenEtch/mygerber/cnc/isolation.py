@@ -0,0 +1,73 @@
+import numpy as np
+from PIL import Image
+
+
+def distance_to_copper(img) -> np.ndarray:
+    """
+    Euclidean distance (pixels) from every pixel to the nearest copper pixel, copper pixels are 0.
+    Computed once in O(pixels), however many isolation passes are taken from it.
+
+    :param img: Rendered copper, copper unset (0) on a set background, as from convert_gerber_to_image
+    :return: (height, width) float32 array, all infinite when there is no copper
+    """
+    from scipy import ndimage  # Optional, only needed for multi pass isolation
+
+    background = np.array(img.convert("1"), dtype=bool)
+
+    # With no zero pixels the transform measures from outside the corner, which would put contours on empty board
+    if background.all():
+        return np.full(background.shape, np.inf, dtype=np.float32)
+
+    return ndimage.distance_transform_edt(background).astype(np.float32)
+
+
+def isolation_contours(distances: np.ndarray, offsets: list) -> np.ndarray:
+    """
+    Pixels on the edge of each offset region, at least offset from the copper with a neighbour that is closer.
+    Like create_outline, each contour is the inner edge of the region so it stays 4 connected.
+
+    :param distances: From distance_to_copper
+    :param offsets: Tool centre distances from the copper in pixels, one contour per offset
+    :return: (height, width) bool array, True on any contour
+    """
+    padded = np.pad(distances, 1, constant_values=np.inf)
+    height, width = distances.shape
+
+    # Closest of the 8 neighbours, past the image edge is never closer
+    nearest_neighbour = distances.copy()
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            if dx or dy:
+                np.minimum(nearest_neighbour, padded[1 + dy:1 + dy + height, 1 + dx:1 + dx + width], out=nearest_neighbour)
+
+    contours = np.zeros(distances.shape, dtype=bool)
+    for offset in offsets:
+        contours |= (distances >= offset) & (nearest_neighbour < offset)
+
+    return contours
+
+
+def create_packed_isolation_outline(img, outline_width, passes=1):
+    """
+    Multi pass version of create_outline, passes contours at outline_width spacing (outline_width, 2 * outline_width ...)
+    all taken from one distance transform, so the cost no longer grows with the tool width or pass count.
+    Distances are euclidean, so corners are rounded like the tool rather than square like create_outline's.
+
+    :return: Bit packed contours, the same format as cpu_path_generator.create_packed_outline
+    """
+    if outline_width <= 0 or passes <= 0:
+        return np.zeros((img.size[1], (img.size[0] + 7) // 8), dtype=np.uint8)
+
+    contours = isolation_contours(distance_to_copper(img), [outline_width * (i + 1) for i in range(passes)])
+
+    return np.packbits(contours, axis=1)
+
+
+def create_isolation_outline(img, outline_width, passes=1):
+    """ :return: "L" image, contours are black (0) on white, the same format as create_outline """
+    if outline_width <= 0 or passes <= 0:
+        return Image.new("L", img.size, 255)
+
+    contours = isolation_contours(distance_to_copper(img), [outline_width * (i + 1) for i in range(passes)])
+
+    return Image.fromarray(np.where(contours, 0, 255).astype(np.uint8))
@@ -0,0 +1,106 @@
+from .settings import Settings
+
+import math
+
+
+class MotionModel:
+    """
+    Running estimate of machining time, fed every move as the G-code is emitted.
+    Moves take their length over their feed rate, slowed by settings.max_z_speed when Z moves and by
+    settings.acceleration when it is set (each move starts and ends at rest). Every spindle start adds
+    settings.spindle_spin_up seconds.
+    """
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.position = (0.0, 0.0, float(settings.travel_height))  # Assumed start, homed above the origin
+        self.spindle_on = False
+
+        self.time = 0.0  # Seconds
+        self.moves = 0
+        self.cut_moves = 0
+        self.travel_moves = 0
+        self.cut_length = 0.0  # mm, G01 / G02 / G03
+        self.travel_length = 0.0  # mm, G00
+        self.plunges = 0  # Cutting moves down into the material
+        self.spindle_starts = 0
+
+    def __move_time(self, length, dz, feed):
+        speed = feed / 60  # mm/s
+        move_time = length / speed
+
+        if self.settings.max_z_speed is not None and dz != 0:
+            move_time = max(move_time, abs(dz) / (self.settings.max_z_speed / 60))
+
+        acceleration = self.settings.acceleration
+        if acceleration is not None and length > 0:
+            # Trapezoid profile, or a triangle when the move is too short to reach full speed
+            if length >= speed ** 2 / acceleration:
+                move_time = max(move_time, length / speed + speed / acceleration)
+            else:
+                move_time = max(move_time, 2 * math.sqrt(length / acceleration))
+
+        return move_time
+
+    def __record(self, x, y, z, length, feed, cutting):
+        dz = z - self.position[2]
+        self.time += self.__move_time(length, dz, feed)
+        self.moves += 1
+
+        if cutting:
+            self.cut_moves += 1
+            self.cut_length += length
+            if dz < 0 and z < 0:
+                self.plunges += 1
+        else:
+            self.travel_moves += 1
+            self.travel_length += length
+
+        self.position = (x, y, z)
+
+    def line(self, x, y, z, feed, cutting=True):
+        """ G00 (cutting=False) / G01, positions in mm """
+        px, py, pz = self.position
+        self.__record(x, y, z, math.sqrt((x - px) ** 2 + (y - py) ** 2 + (z - pz) ** 2), feed, cutting)
+
+    def polyline(self, xs, ys, z, feed):
+        """ G01 to each point in turn, positions in mm """
+        for x, y in zip(xs.tolist(), ys.tolist()):
+            self.line(x, y, z, feed)
+
+    def arc(self, x, y, i, j, z, feed, clockwise=True):
+        """ G02 / G03, i and j are the centre relative to the current position, all in mm """
+        px, py, pz = self.position
+        cx, cy = px + i, py + j
+        radius = math.hypot(i, j)
+
+        sweep = math.atan2(y - cy, x - cx) - math.atan2(py - cy, px - cx)
+        if clockwise:
+            sweep = -sweep
+        sweep %= 2 * math.pi
+
+        if sweep == 0:
+            sweep = 2 * math.pi  # End on the start is a full circle
+
+        self.__record(x, y, z, math.hypot(radius * sweep, z - pz), feed, True)
+
+    def spin(self):
+        if not self.spindle_on:
+            self.time += self.settings.spindle_spin_up
+            self.spindle_starts += 1
+
+        self.spindle_on = True
+
+    def stop(self):
+        self.spindle_on = False
+
+    def stats(self) -> dict:
+        return {
+            "moves": self.moves,
+            "cut_moves": self.cut_moves,
+            "travel_moves": self.travel_moves,
+            "cut_length": self.cut_length,
+            "travel_length": self.travel_length,
+            "plunges": self.plunges,
+            "spindle_starts": self.spindle_starts,
+            "estimated_time": self.time,
+        }
@@ -0,0 +1,45 @@
+from . import cpu_path_generator, gpu_path_generator
+from .isolation import create_packed_isolation_outline
+
+
+# Every backend module provides create_outline(img, outline_width) and create_packed_outline(img, outline_width),
+# producing identical outlines
+BACKENDS = {
+    "opencl": gpu_path_generator,
+    "cpu": cpu_path_generator
+}
+
+
+def get_backend(name: str = "auto"):
+    """
+    :param name: "auto" picks OpenCL when a device is present, otherwise the CPU
+    :return: Backend module
+    """
+    if name == "auto":
+        name = "opencl" if gpu_path_generator.is_available() else "cpu"
+
+    if name not in BACKENDS:
+        raise KeyError(f"Unknown outline backend '{name}', expected one of: auto, {', '.join(BACKENDS)}")
+
+    return BACKENDS[name]
+
+
+def create_outline(img, outline_width, backend: str = "auto"):
+    return get_backend(backend).create_outline(img, outline_width)
+
+
+def create_packed_outline(img, outline_width, backend: str = "auto"):
+    return get_backend(backend).create_packed_outline(img, outline_width)
+
+
+def create_packed_tool_outline(img, settings):
+    """
+    Bit packed outline of the rendered copper for settings' tool width, with settings.isolation_passes passes.
+    See cpu_path_generator.create_packed_outline for the format
+    """
+    outline_width = round(settings.cutting_tool_width * settings.scale)
+
+    if settings.isolation_passes > 1:
+        return create_packed_isolation_outline(img, outline_width, settings.isolation_passes)
+
+    return create_packed_outline(img, outline_width, settings.outline_backend)
@@ -0,0 +1,221 @@
+import numpy as np
+import math
+
+
+TWO_OPT_WINDOW = 256  # Furthest ahead (in route positions) a 2-opt reversal may reach, keeps large jobs near linear
+TWO_OPT_PASSES = 8
+LOOP_ENTRY_CANDIDATES = 64  # Vertices per loop considered as its entry point
+
+
+class SpatialIndex:
+    """ Uniform grid of points, for nearest neighbour queries while points are removed """
+    def __init__(self, points: np.ndarray):
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self.removed = np.zeros(len(self.points), dtype=bool)
+        self.remaining = len(self.points)
+
+        low, high = self.points.min(axis=0, initial=0), self.points.max(axis=0, initial=0)
+        area = max((high[0] - low[0]) * (high[1] - low[1]), 1e-9)
+        self.cell_size = max(math.sqrt(area / max(len(self.points), 1)) * 2, 1e-9)
+        self.origin = low
+
+        cells = np.floor((self.points - low) / self.cell_size).astype(np.int64)
+        self.grid_size = cells.max(axis=0, initial=0) + 1
+
+        self.point_cells = list(map(tuple, cells.tolist()))
+        self.cells = {}
+        for index, cell in enumerate(self.point_cells):
+            self.cells.setdefault(cell, []).append(index)
+
+    def remove(self, index: int) -> None:
+        if not self.removed[index]:
+            self.removed[index] = True
+            self.remaining -= 1
+            self.cells[self.point_cells[index]].remove(index)
+
+    def nearest(self, x: float, y: float) -> None | int:
+        """ Index of the closest point not yet removed, None once all are gone """
+        if self.remaining == 0:
+            return None
+
+        cell_x = math.floor((x - self.origin[0]) / self.cell_size)
+        cell_y = math.floor((y - self.origin[1]) / self.cell_size)
+
+        best, best_distance = None, math.inf
+        max_ring = max(abs(cell_x), abs(cell_y), abs(cell_x - self.grid_size[0]), abs(cell_y - self.grid_size[1])) + 1
+
+        for ring in range(max_ring + 1):
+            # Points in this ring are at least (ring - 1) cells away
+            if best is not None and best_distance <= (ring - 1) * self.cell_size:
+                break
+
+            # Few points left spread over many empty cells, checking every remaining point is cheaper
+            if (2 * ring + 1) ** 2 > 4 * self.remaining:
+                return self.__nearest_remaining(x, y)
+
+            for cell in self.__ring_cells(cell_x, cell_y, ring):
+                for index in self.cells.get(cell, ()):
+                    distance = math.hypot(self.points[index, 0] - x, self.points[index, 1] - y)
+                    if distance < best_distance:
+                        best, best_distance = index, distance
+
+        return best
+
+    def __nearest_remaining(self, x, y) -> int:
+        remaining = np.flatnonzero(~self.removed)
+        return int(remaining[np.argmin(np.hypot(self.points[remaining, 0] - x, self.points[remaining, 1] - y))])
+
+    @staticmethod
+    def __ring_cells(cell_x, cell_y, ring):
+        if ring == 0:
+            yield cell_x, cell_y
+            return
+
+        for dx in range(-ring, ring + 1):
+            yield cell_x + dx, cell_y - ring
+            yield cell_x + dx, cell_y + ring
+
+        for dy in range(-ring + 1, ring):
+            yield cell_x - ring, cell_y + dy
+            yield cell_x + ring, cell_y + dy
+
+
+def route_length(points: np.ndarray, start=(0, 0)) -> float:
+    """ Travel from start through each point in order """
+    path = np.vstack((np.asarray(start, dtype=np.float64).reshape(1, 2), np.asarray(points, dtype=np.float64).reshape(-1, 2)))
+    return float(np.sum(np.hypot(*np.diff(path, axis=0).T)))
+
+
+def nearest_neighbour_order(points: np.ndarray, start=(0, 0)) -> list[int]:
+    index = SpatialIndex(points)
+    order = []
+    x, y = start
+
+    while (nearest := index.nearest(x, y)) is not None:
+        index.remove(nearest)
+        order.append(nearest)
+        x, y = index.points[nearest]
+
+    return order
+
+
+def two_opt(points: np.ndarray, order: list[int], start=(0, 0), window=TWO_OPT_WINDOW, passes=TWO_OPT_PASSES) -> list[int]:
+    """
+    Improves an open route (fixed start, free end) by reversing sections while that shortens it.
+    Each position is checked against the next `window` positions, all at once with numpy.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    order = list(order)
+    count = len(order)
+
+    if count < 3:
+        return order
+
+    for _ in range(passes):
+        improved = False
+        path = np.vstack((np.asarray(start, dtype=np.float64).reshape(1, 2), points[order]))  # path[k] is position k - 1
+
+        for i in range(1, count):
+            j = np.arange(i + 1, min(i + window, count) + 1)
+            before, first = path[i - 1], path[i]
+
+            # Reversing positions i..j swaps edges (i-1, i) + (j, j+1) for (i-1, j) + (i, j+1), the end has no j+1 edge
+            after_j = np.minimum(j + 1, count)
+            has_next = j < count
+
+            removed = np.hypot(*(first - before)) + np.where(has_next, np.hypot(*(path[after_j] - path[j]).T), 0)
+            added = np.hypot(*(path[j] - before).T) + np.where(has_next, np.hypot(*(path[after_j] - first).T), 0)
+
+            gains = removed - added
+            best = int(np.argmax(gains))
+
+            if gains[best] > 1e-9:
+                end = int(j[best])
+                order[i - 1:end] = order[i - 1:end][::-1]
+                path[i:end + 1] = path[i:end + 1][::-1]
+                improved = True
+
+        if not improved:
+            break
+
+    return order
+
+
+def optimise_order(points: np.ndarray, start=(0, 0)) -> list[int]:
+    """ Nearest neighbour, then 2-opt. :return: indices into points, in visiting order """
+    if len(points) == 0:
+        return []
+
+    return two_opt(points, nearest_neighbour_order(points, start), start)
+
+
+def entry_candidates(loop: np.ndarray) -> np.ndarray:
+    """ Indices of up to LOOP_ENTRY_CANDIDATES vertices spread evenly around a loop """
+    stride = max(1, -(-len(loop) // LOOP_ENTRY_CANDIDATES))  # Rounded up, so there are never more than the cap
+    return np.arange(0, len(loop), stride)
+
+
+def optimise_loop_order(loops: list, start=(0, 0)) -> list[tuple[int, int]]:
+    """
+    Orders closed loops (cut from their entry vertex back round to it) for the least travel between them.
+    Each loop is entered at whichever of its vertices is nearest the end of the previous one.
+
+    :param loops: list of (n, 2) array-likes
+    :return: list of (loop index, entry vertex index) in cutting order
+    """
+    if not loops:
+        return []
+
+    loops = [np.asarray(loop, dtype=np.float64).reshape(-1, 2) for loop in loops]
+
+    candidates = [entry_candidates(loop) for loop in loops]
+    owners = np.concatenate([np.full(len(c), i) for i, c in enumerate(candidates)])
+    vertices = np.concatenate([loop[c] for loop, c in zip(loops, candidates)])
+
+    # Nearest neighbour over every candidate vertex, so entries come out with the order
+    index = SpatialIndex(vertices)
+    loop_vertices = [np.flatnonzero(owners == i) for i in range(len(loops))]
+    order, entries = [], []
+    x, y = start
+
+    while (nearest := index.nearest(x, y)) is not None:
+        loop_index = int(owners[nearest])
+        for vertex in loop_vertices[loop_index]:
+            index.remove(vertex)
+
+        order.append(loop_index)
+        entries.append(vertices[nearest])
+        x, y = vertices[nearest]
+
+    # 2-opt on the chosen entry points, then re-pick each entry for the final order
+    order = [order[i] for i in two_opt(np.array(entries), list(range(len(order))), start)]
+
+    route = []
+    position = np.asarray(start, dtype=np.float64)
+    for loop_index in order:
+        loop = loops[loop_index]
+        entry = int(np.argmin(np.hypot(*(loop - position).T)))
+
+        route.append((loop_index, entry))
+        position = loop[entry]
+
+    return route
+
+
+def loop_route_length(loops: list, route: None | list = None, start=(0, 0)) -> float:
+    """ Travel between closed loops cut in route order, by default as given and each entered at its first vertex """
+    if route is None:
+        route = [(i, 0) for i in range(len(loops))]
+
+    return route_length([loops[i][entry] for i, entry in route], start)
+
+
+def rotate_loop(loop: list, entry: int) -> list:
+    """ A closed loop (first point == last) starting and ending at loop[entry] instead """
+    if entry == 0 or len(loop) < 2:
+        return loop
+
+    if loop[0] == loop[-1]:
+        return loop[entry:-1] + loop[:entry] + [loop[entry]]
+
+    return loop[entry:] + loop[:entry]
@@ -14,6 +14,25 @@ class DefaultSettings:
 
     create_drill_dimples = True
 
+    # Machine limits, only used for the header's estimated time
+    spindle_spin_up = 2  # Seconds for the spindle to reach speed after M03 / M04
+    max_z_speed = None  # mm/minute, if the Z axis is slower than the feed rates
+    acceleration = None  # mm/s², None treats every move as reaching its feed rate instantly
+
+    gcode_decimals = 4  # Decimal places written for every number, 4 is 0.1um
+    gcode_strip_zeros = True  # X1.5 rather than X1.5000
+    gcode_modal = True  # Leave out X / Y / Z / F words that have not changed since the last line
+    gcode_modal_motion = False  # Also leave out repeated G00 / G01, Marlin only accepts this with GCODE_MOTION_MODES
+
+    toolpath_engine = "raster"  # "raster" (render the copper and trace the outline) or "vector" (offset the copper geometry, needs shapely)
+    isolation_passes = 1  # More than 1 adds clearance passes at tool width spacing (needs scipy)
+    simplify_paths = True  # Merge straight runs / near straight pixels into longer moves (see simplify.simplify_tolerance)
+    fit_arcs = False  # Also replace curves with G02 / G03 arcs
+    outline_backend = "auto"  # "auto" (OpenCL if there is a device, else CPU), "opencl" or "cpu"
+    raster_strip_rows = 0  # Render, outline and trace board images a strip of this many rows at a time (0 only uses strips past raster_memory_limit)
+    raster_memory_limit = 1024  # MB of raster working memory, board images needing more as one image are done in strips sized to fit it
+    raster_workers = 4  # Strips rendered and outlined at once
+
     machine = "A400"
     tool_head = "levelTwoCNCToolheadForSM2"
     max_power = 255,
@@ -0,0 +1,198 @@
+import numpy as np
+import math
+
+
+SIMPLIFY_TOOL_FRACTION = 0.25  # Max deviation from the traced path, as a fraction of the tool width
+MIN_ARC_POINTS = 5
+MAX_ARC_SWEEP = 1.5 * math.pi  # Stay clear of full circles, where the end point no longer defines the arc
+
+
+def simplify_tolerance(settings, scale) -> float:
+    """
+    Max distance a simplified path may stray from the original, in path units.
+    A quarter of the tool width, but never under one image pixel as the traced outline is only that accurate.
+
+    :param scale: Path units per mm (settings.scale for image pixels, 1 for mm)
+    """
+    return max(1 / settings.scale, settings.cutting_tool_width * SIMPLIFY_TOOL_FRACTION) * scale
+
+
+def collapse_collinear(points: np.ndarray) -> np.ndarray:
+    """ Removes repeated points and points in the middle of straight runs, e.g. every pixel along a straight edge """
+    if len(points) < 3:
+        return points
+
+    # Repeated points first, so every step below has a direction
+    moved = np.ones(len(points), dtype=bool)
+    moved[1:] = np.any(points[1:] != points[:-1], axis=1)
+    points = points[moved]
+
+    if len(points) < 3:
+        return points
+
+    steps = np.diff(points, axis=0)
+    cross = steps[:-1, 0] * steps[1:, 1] - steps[:-1, 1] * steps[1:, 0]
+    dot = np.sum(steps[:-1] * steps[1:], axis=1)
+
+    keep = np.ones(len(points), dtype=bool)
+    keep[1:-1] = (cross != 0) | (dot <= 0)  # Turning, or doubling back on itself
+
+    return points[keep]
+
+
+def segment_distances(points: np.ndarray, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    """ Distance from each point to the segment start -> end (not the infinite line, so spurs are never cut off) """
+    direction = end - start
+    length_squared = np.dot(direction, direction)
+
+    if length_squared == 0:
+        return np.hypot(*(points - start).T)
+
+    t = np.clip(((points - start) @ direction) / length_squared, 0, 1)
+    return np.hypot(*(points - (start + t[:, None] * direction)).T)
+
+
+def douglas_peucker(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """ Ramer-Douglas-Peucker, iterative so long outlines don't hit the recursion limit """
+    if len(points) < 3:
+        return points
+
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(points) - 1)]
+
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+
+        distances = segment_distances(points[start + 1:end], points[start], points[end])
+        furthest = int(np.argmax(distances))
+
+        if distances[furthest] > tolerance:
+            split = start + 1 + furthest
+            keep[split] = True
+            stack += [(start, split), (split, end)]
+
+    return points[keep]
+
+
+def simplify_polyline(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """ douglas_peucker, closed loops (first point == last) are split at their furthest point first """
+    if len(points) > 3 and np.array_equal(points[0], points[-1]):
+        split = int(np.argmax(np.hypot(*(points - points[0]).T)))
+
+        if split > 0:
+            first = douglas_peucker(points[:split + 1], tolerance)
+            second = douglas_peucker(points[split:], tolerance)
+            return np.concatenate((first, second[1:]))
+
+    return douglas_peucker(points, tolerance)
+
+
+def circumcentre(a, b, c):
+    """ Centre of the circle through three points, None if they are collinear """
+    d = 2 * (a[0] * (b[1] - c[1]) + b[0] * (c[1] - a[1]) + c[0] * (a[1] - b[1]))
+    if abs(d) < 1e-12:
+        return None
+
+    a_sq, b_sq, c_sq = a @ a, b @ b, c @ c
+    return np.array([
+        (a_sq * (b[1] - c[1]) + b_sq * (c[1] - a[1]) + c_sq * (a[1] - b[1])) / d,
+        (a_sq * (c[0] - b[0]) + b_sq * (a[0] - c[0]) + c_sq * (b[0] - a[0])) / d
+    ])
+
+
+def fit_arc(points: np.ndarray, tolerance: float):
+    """
+    Circle through the ends and middle of points, if every point is within tolerance of it
+    and they sweep steadily one way round it.
+
+    :return: (centre, clockwise) or None
+    """
+    # Close enough to straight for a line, don't make a huge radius arc out of it
+    if np.max(segment_distances(points, points[0], points[-1])) <= tolerance:
+        return None
+
+    centre = circumcentre(points[0], points[len(points) // 2], points[-1])
+    if centre is None:
+        return None
+
+    offsets = points - centre
+    radius = np.hypot(*offsets[0])
+
+    if np.max(np.abs(np.hypot(*offsets.T) - radius)) > tolerance:
+        return None
+
+    # The arc bulges away from the straight moves between the points, long moves (straight edges) can't be arcs
+    half_chords = np.hypot(*np.diff(points, axis=0).T) / 2
+    if np.any(half_chords > radius) or np.max(radius - np.sqrt(radius ** 2 - half_chords ** 2)) > tolerance:
+        return None
+
+    angles = np.diff(np.unwrap(np.arctan2(offsets[:, 1], offsets[:, 0])))
+    if not (np.all(angles > 0) or np.all(angles < 0)) or abs(np.sum(angles)) > MAX_ARC_SWEEP:
+        return None
+
+    return centre, bool(angles[0] < 0)
+
+
+def fit_arcs(points: np.ndarray, tolerance: float) -> list:
+    """
+    Splits a path into arcs and the straight runs between them, arcs are grown greedily from each point.
+
+    :return: list of moves, (x, y) for a line or (x, y, i, j, clockwise) for an arc (i, j the centre relative to its start)
+    """
+    moves = []
+    run_start = 0
+    start = 0
+
+    def add_lines(end):
+        for x, y in simplify_polyline(points[run_start:end + 1], tolerance)[1:].tolist():
+            moves.append((x, y))
+
+    while start < len(points) - MIN_ARC_POINTS:
+        end = start + MIN_ARC_POINTS - 1
+        arc = fit_arc(points[start:end + 1], tolerance)
+
+        if arc is None:
+            start += 1
+            continue
+
+        # Grow the arc one point at a time while it still fits
+        while end + 1 < len(points):
+            grown = fit_arc(points[start:end + 2], tolerance)
+            if grown is None:
+                break
+            arc, end = grown, end + 1
+
+        add_lines(start)
+
+        centre, clockwise = arc
+        i, j = (centre - points[start]).tolist()
+        x, y = points[end].tolist()
+        moves.append((x, y, i, j, clockwise))
+
+        run_start = start = end
+
+    add_lines(len(points) - 1)
+
+    return moves
+
+
+def simplify_path(points, tolerance: float, arcs: bool = False) -> list:
+    """
+    Fewer, longer moves along the same path. Straight runs are collapsed, then the rest is simplified to within tolerance.
+
+    :param points: Sequence of (x, y), e.g. an ordered loop of outline pixels
+    :param arcs: Also fit G02 / G03 arcs
+    :return: list of moves (see fit_arcs), starting with the first point
+    """
+    points = collapse_collinear(np.asarray(points, dtype=np.float64).reshape(-1, 2))
+
+    if len(points) == 0:
+        return []
+
+    if arcs:
+        return [tuple(points[0].tolist())] + fit_arcs(points, tolerance)
+
+    return [tuple(point) for point in simplify_polyline(points, tolerance).tolist()]
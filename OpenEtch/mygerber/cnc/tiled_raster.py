@@ -0,0 +1,110 @@
+from .settings import Settings
+from .gerber_to_image import board_frame, create_view
+from .outline_backend import create_packed_tool_outline, get_backend
+from . import gpu_path_generator
+from .image_to_toolpath import loops_to_tool_path, trace_packed_loops, tool_clear_radius, padding_bytes
+from ..render.renderer import image_size
+
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+
+# Peak memory per board image pixel while rendering, outlining and tracing it (cpu backend, measured on the
+# bundled keyboard board: about 3.4 as one image, 4.7 in strips), used to size strips for settings.raster_memory_limit
+RASTER_BYTES_PER_PIXEL = 4
+MIN_STRIP_ROWS = 64
+
+
+def strip_halo(settings: Settings) -> int:
+    """ Extra rows rendered either side of a strip, enough for its own rows to outline exactly as in the full image """
+    outline_width = round(settings.cutting_tool_width * settings.scale)
+
+    if settings.isolation_passes > 1:
+        return outline_width * settings.isolation_passes + 2  # The furthest contour and its closer neighbour
+
+    return outline_width + 1
+
+
+def strip_ranges(height: int, strip_rows: int) -> list[tuple[int, int]]:
+    return [(first, min(first + strip_rows, height)) for first in range(0, height, strip_rows)]
+
+
+def strip_workers(settings: Settings) -> int:
+    # The OpenCL device already runs a strip in parallel, and its kernel objects are not safe to share between threads
+    uses_opencl = settings.isolation_passes <= 1 and get_backend(settings.outline_backend) is gpu_path_generator
+    return 1 if uses_opencl else max(1, settings.raster_workers)
+
+
+def strip_rows(settings: Settings, width: int, height: int) -> int:
+    """
+    Rows per strip for a width x height board image, 0 to do it as one image.
+    settings.raster_strip_rows when set, otherwise strips are only used for images that would need more than
+    settings.raster_memory_limit, sized so the strips being worked on at once fit in it.
+    """
+    if settings.raster_strip_rows > 0:
+        return settings.raster_strip_rows if settings.raster_strip_rows < height else 0
+
+    budget = settings.raster_memory_limit * 1024 * 1024
+    if width * height * RASTER_BYTES_PER_PIXEL <= budget:
+        return 0
+
+    # The packed outline of the whole board is always kept, the strips share what is left
+    strip_budget = budget - width * height // 8
+    rows = strip_budget // (strip_workers(settings) * width * RASTER_BYTES_PER_PIXEL) - 2 * strip_halo(settings)
+
+    return min(max(MIN_STRIP_ROWS, rows), height)
+
+
+def outline_strip(pcb, settings: Settings, layer_names: list[str], first_row: int, end_row: int) -> np.ndarray:
+    """
+    Renders and outlines rows first_row..end_row of the board image, with a halo of rows either side
+    so the strip's edges don't show in the outline.
+
+    :return: (rows, ceil(width / 8)) uint8, bit packed dark outline pixels of just those rows
+    """
+    height = image_size(board_frame(pcb, settings)[0])[1]
+    halo = strip_halo(settings)
+    top, bottom = max(0, first_row - halo), min(height, end_row + halo)
+
+    outline = create_packed_tool_outline(create_view(pcb, settings, layer_names, rows=(top, bottom)).image, settings)
+
+    return outline[first_row - top:end_row - top]
+
+
+def tiled_outline(pcb, settings: Settings, layer_names: list[str], clear_radius: int, rows_per_strip: int):
+    """
+    The board's outline rows_per_strip rows at a time, strips are done settings.raster_workers at once.
+    Only the bit packed outline is kept for the whole board, already padded for trace_packed_loops.
+
+    :return: (foreground bytearray, bytes per padded row)
+    """
+    width, height = image_size(board_frame(pcb, settings)[0])
+    pad = padding_bytes(clear_radius)
+    row_bytes = (width + 7) // 8 + 2 * pad
+
+    foreground = bytearray(row_bytes * (height + 2 * clear_radius))
+    rows = np.frombuffer(foreground, dtype=np.uint8).reshape(-1, row_bytes)
+
+    strips = strip_ranges(height, rows_per_strip)
+
+    with ThreadPoolExecutor(max_workers=strip_workers(settings)) as executor:
+        packed_strips = executor.map(lambda strip: outline_strip(pcb, settings, layer_names, *strip), strips)
+
+        for (first_row, end_row), packed in zip(strips, packed_strips):
+            rows[clear_radius + first_row:clear_radius + end_row, pad:row_bytes - pad] = packed
+
+    return foreground, row_bytes
+
+
+def tiled_tool_path(pcb, settings: Settings, layer_names: list[str], rows_per_strip: int, stats: None | dict = None, writer=None):
+    """
+    image_to_tool_path for a board too large to render as one image. The outline is made in strips (see strip_rows),
+    and traced from the packed outline of the whole board so loops carry on across strip edges without being joined up.
+    """
+    print(f"Outlining {', '.join(layer_names)} in strips of {rows_per_strip} rows")
+
+    clear_radius = tool_clear_radius(settings)
+    foreground, row_bytes = tiled_outline(pcb, settings, layer_names, clear_radius, rows_per_strip)
+    loops, _ = trace_packed_loops(foreground, row_bytes, clear_radius)
+
+    return loops_to_tool_path(loops, settings, stats, writer)
@@ -0,0 +1,114 @@
+from .settings import Settings
+from .gcode import CNC_Gcode, GcodeWriter
+from .simplify import simplify_path, simplify_tolerance
+from .route import optimise_loop_order, loop_route_length, rotate_loop
+
+import numpy as np
+
+
+QUAD_SEGMENTS = 8  # Straight sections per quarter circle of the offset arcs
+COORDINATE_DECIMALS = 4  # mm, 0.1um
+
+
+def layer_copper(layer):
+    """
+    Union of every trace, pad and hole of a layer as shapely geometry, in board mm.
+    Traces are buffered segments, so zero length ones come out as circles like the rendered view.
+    """
+    import shapely  # Optional, only needed for the vector toolpath engine
+
+    geometry = layer.geometry
+    shapes = []
+
+    segments = geometry.segments
+    if len(segments) > 0:
+        lines = shapely.linestrings(np.stack((segments["x1"], segments["y1"], segments["x2"], segments["y2"]), axis=1).reshape(-1, 2, 2))
+        shapes.extend(shapely.buffer(lines, segments["width"] / 2, quad_segs=QUAD_SEGMENTS).tolist())
+
+    for polygon in geometry.polygons():
+        if len(polygon) >= 3:
+            shapes.append(shapely.make_valid(shapely.Polygon(polygon)))
+
+    holes = geometry.holes
+    if len(holes) > 0:
+        points = shapely.points(np.stack((holes["x"], holes["y"]), axis=1))
+        shapes.extend(shapely.buffer(points, holes["diameter"] / 2, quad_segs=QUAD_SEGMENTS).tolist())
+
+    return shapely.union_all(shapes)
+
+
+def isolation_rings(copper, tool_width: float, passes: int = 1) -> list[np.ndarray]:
+    """
+    Tool centre loops around the copper. The first pass is offset by half the tool width so the cut just touches
+    the copper, each extra pass is a further tool width out.
+
+    :param copper: From layer_copper
+    :param tool_width: mm
+    :return: list of (n, 2) closed rings (first point repeated at the end), in board mm
+    """
+    import shapely  # Optional, only needed for the vector toolpath engine
+
+    rings = []
+    for i in range(passes):
+        offset = shapely.buffer(copper, tool_width / 2 + i * tool_width, quad_segs=QUAD_SEGMENTS)
+
+        for ring in shapely.get_rings(shapely.get_parts(offset)).tolist():
+            if not ring.is_empty:
+                rings.append(shapely.get_coordinates(ring))
+
+    return rings
+
+
+def layer_to_tool_path(pcb, layer_name: str, settings: Settings, stats: None | dict = None, writer: None | GcodeWriter = None):
+    """
+    Isolation toolpath straight from the parsed geometry, no image is rendered.
+    Positions use the same frame as the raster engine (x from the outline's left edge, y down from its top edge).
+
+    :param stats: Optional dict, "moves_before" / "moves_after" simplification and "travel_before" / "travel_after"
+        route optimisation (mm) are added to it
+    :param writer: Optional GcodeWriter to stream the moves to, the returned str is then empty
+    :return: gcode str, without the header
+    """
+    gcode = CNC_Gcode(settings, scale=1, writer=writer)
+    tolerance = simplify_tolerance(settings, 1)
+    stats = {} if stats is None else stats
+
+    if layer_name not in pcb:
+        return gcode.gcode
+
+    print(f"Generating vector tool path for {layer_name}")
+
+    outline = pcb.get_component("Outline")
+    min_x, max_y = outline.min_xy[0], outline.max_xy[1]
+
+    rings = isolation_rings(layer_copper(pcb.get_component(layer_name)), settings.cutting_tool_width, settings.isolation_passes)
+
+    loops = []
+    for ring in rings:
+        points = np.round(np.stack((ring[:, 0] - min_x, max_y - ring[:, 1]), axis=1), COORDINATE_DECIMALS)
+
+        # Drop points that round onto the one before, they would only be zero length moves
+        keep = np.ones(len(points), dtype=bool)
+        keep[1:] = np.any(points[1:] != points[:-1], axis=1)
+        loops.append(points[keep].tolist())
+
+    route = optimise_loop_order(loops)
+    stats["travel_before"] = stats.get("travel_before", 0) + loop_route_length(loops)
+    stats["travel_after"] = stats.get("travel_after", 0) + loop_route_length(loops, route)
+
+    for loop_index, entry in route:
+        points = rotate_loop(loops[loop_index], entry)
+
+        moves = simplify_path(points, tolerance, settings.fit_arcs) if settings.simplify_paths else points
+        stats["moves_before"] = stats.get("moves_before", 0) + len(points)
+        stats["moves_after"] = stats.get("moves_after", 0) + len(moves)
+
+        gcode.go_to(points[0][0], points[0][1], settings.travel_height)
+        gcode.spin()
+
+        gcode.cut_path(moves, settings.cut_height)
+
+        gcode.stop()
+        gcode.go_to(points[0][0], points[0][1], settings.travel_height)
+
+    return gcode.gcode
@@ -0,0 +1,98 @@
+from .reader.geometry import LayerGeometry
+
+import numpy as np
+import zipfile
+import hashlib
+import uuid
+import os
+
+
+# Bump whenever the parsers produce different geometry, so old cache entries are never used
+PARSER_VERSION = 1
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "OpenEtch", "layers")
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024  # bytes
+
+
+class LayerCache:
+    """
+    On disk cache of parsed layers, one .npz of geometry arrays per layer file.
+    Entries are keyed on the SHA-256 of the layer file, the parser used and PARSER_VERSION.
+    The least recently used entries are removed once the directory grows past max_size bytes.
+    """
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_size: int = DEFAULT_CACHE_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def key(loader, file_hash: str) -> str:
+        return hashlib.sha256(f"{PARSER_VERSION}:{loader.__name__}:{file_hash}".encode()).hexdigest()
+
+    def __path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def load(self, key: str, loader):
+        """
+        Returns the cached layer, or None on a miss
+
+        :param key: From LayerCache.key
+        :param loader: Layer class to rebuild (TraceLayer / ThoughHole)
+        """
+        path = self.__path(key)
+
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                geometry = LayerGeometry.from_arrays(data["segments"], data["polygon_vertices"], data["polygon_offsets"], data["holes"])
+
+        except (FileNotFoundError, OSError, KeyError, ValueError, zipfile.BadZipFile):
+            return None
+
+        try:
+            os.utime(path)  # Mark as recently used
+        except FileNotFoundError:
+            pass  # Evicted by another process since it was read, the geometry is still good
+
+        return loader.from_geometry(geometry)
+
+    def store(self, key: str, layer) -> None:
+        path = self.__path(key)
+        temp_path = os.path.join(self.directory, f"{uuid.uuid4()}.tmp")
+
+        # Write then rename, so readers never see half written entries
+        try:
+            with open(temp_path, "wb") as f:
+                np.savez(f, **layer.geometry.to_arrays())
+            os.replace(temp_path, path)
+
+        except BaseException:
+            # Don't leave the partial file behind, evict only looks at .npz entries
+            try:
+                os.remove(temp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+        self.evict()
+
+    def evict(self) -> None:
+        """ Removes least recently used entries until the cache fits in max_size """
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(".npz"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total_size = sum(size for _, size, _ in entries)
+
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # Already removed by another process
+
+            total_size -= size
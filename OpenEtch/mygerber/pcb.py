@@ -1,50 +1,116 @@
 from . import zip_manager
+from .layer_cache import LayerCache
+from .reader.geometry import LayerGeometry
 from .reader import trace_layer, though_hole_layer
 import math
 import os
 
 
+LAYER_FILES = [
+    # Gerber Filename            Parser            Internal name   Colour
+    ("Gerber_BottomLayer.GBL", trace_layer.TraceLayer, "BottomLayer", (0, 0, 255)),
+    ("Gerber_BottomSilkscreenLayer.GBO", trace_layer.TraceLayer, "BottomSilk", (60, 60, 60)),
+
+    ("Gerber_TopLayer.GTL", trace_layer.TraceLayer, "TopLayer", (255, 0, 0)),
+    ("Gerber_TopSilkscreenLayer.GTO", trace_layer.TraceLayer, "TopSilk", (255, 255, 0)),
+    ("Drill_PTH_Through_Via.DRL", though_hole_layer.ThoughHole, "Vias", (255, 102, 0)),
+    ("Drill_NPTH_Through.DRL", though_hole_layer.ThoughHole, "NoPlateThoughHole", (20, 20, 20)),
+    ("Drill_PTH_Through.DRL", though_hole_layer.ThoughHole, "PlatedThoughHole", (50, 50, 50)),
+    ("Gerber_BoardOutlineLayer.GKO", trace_layer.TraceLayer, "Outline", (157, 0, 255))
+]
+
+
+def load_layer(path: str, file: str, loader):
+    """
+    Parses a single layer file out of a gerber zip / directory.
+    Runs inside worker processes when loading in parallel, so only the geometry arrays (LayerGeometry.to_arrays) are
+    returned, not the parser state. Rebuild the layer with loader.from_geometry(LayerGeometry.from_arrays(**arrays))
+    """
+    with zip_manager.GerberFile(path) as gerber_file:
+        return loader(gerber_file.open(file, "r")).geometry.to_arrays()
+
+
 class PCB:
-    def __init__(self, path: str):
+    def __init__(self, path: str, workers: int = 1, cache: None | LayerCache = None):
+        """
+        :param path: Gerber zip or directory
+        :param workers: Number of processes used to parse layers, 1 parses them in this process
+        :param cache: Optional LayerCache, checked before parsing each layer and filled after
+        """
         if not os.path.exists(path):
             raise FileNotFoundError(path)
 
         self.path = path
-        self.min_xy = [math.inf, math.inf]
-        self.max_xy = [-math.inf, -math.inf]
+        self.workers = workers
+        self.cache = cache
 
         self.__components = {}
         self.__component_colours = {}
 
-        self.__load()
+        if workers > 1:
+            self.__load_parallel()
+        else:
+            self.__load()
+
+    def __load_cached(self, gerber_file) -> list:
+        """
+        Fills in every present layer that is already cached.
+        :return: list of (file, loader, key, colour, cache_key) still needing to be parsed
+        """
+        to_parse = []
+
+        for file, loader, key, colour in LAYER_FILES:
+            if not gerber_file.has_file(file):
+                continue
+
+            cache_key = None
+            if self.cache is not None:
+                cache_key = self.cache.key(loader, gerber_file.hash_file(file))
+                cached_layer = self.cache.load(cache_key, loader)
+
+                if cached_layer is not None:
+                    self.__components[key] = cached_layer
+                    self.__component_colours[key] = colour
+                    continue
+
+            to_parse.append((file, loader, key, colour, cache_key))
+
+        return to_parse
+
+    def __add_parsed(self, layer, key, colour, cache_key) -> None:
+        self.__components[key] = layer
+        self.__component_colours[key] = colour
+
+        if self.cache is not None:
+            self.cache.store(cache_key, layer)
+
+    def __sort_components(self) -> None:
+        # Keep LAYER_FILES order however the layers were loaded
+        order = [key for _, _, key, _ in LAYER_FILES]
+        self.__components = dict(sorted(self.__components.items(), key=lambda item: order.index(item[0])))
 
     def __load(self) -> None:
-        possible_files = [
-            # Gerber Filename            Parser            Internal name   Colour
-            ("Gerber_BottomLayer.GBL", trace_layer.TraceLayer, "BottomLayer", (0, 0, 255)),
-            ("Gerber_BottomSilkscreenLayer.GBO", trace_layer.TraceLayer, "BottomSilk", (60, 60, 60)),
-
-            ("Gerber_TopLayer.GTL", trace_layer.TraceLayer, "TopLayer", (255, 0, 0)),
-            ("Gerber_TopSilkscreenLayer.GTO", trace_layer.TraceLayer, "TopSilk", (255, 255, 0)),
-            ("Drill_PTH_Through_Via.DRL", though_hole_layer.ThoughHole, "Vias", (255, 102, 0)),
-            ("Drill_NPTH_Through.DRL", though_hole_layer.ThoughHole, "NoPlateThoughHole", (20, 20, 20)),
-            ("Drill_PTH_Through.DRL", though_hole_layer.ThoughHole, "PlatedThoughHole", (50, 50, 50)),
-            ("Gerber_BoardOutlineLayer.GKO", trace_layer.TraceLayer, "Outline", (157, 0, 255))
-        ]
+        with zip_manager.GerberFile(self.path) as gerber_file:
+            for file, loader, key, colour, cache_key in self.__load_cached(gerber_file):
+                self.__add_parsed(loader(gerber_file.open(file, "r")), key, colour, cache_key)
+
+        self.__sort_components()
 
+    def __load_parallel(self) -> None:
         with zip_manager.GerberFile(self.path) as gerber_file:
-            for file, loader, key, colour in possible_files:
-                file_obj = gerber_file.open(file, "r")
+            to_parse = self.__load_cached(gerber_file)
 
-                if file_obj:
-                    loaded_obj = loader(file_obj)
-                    self.__components[key] = loaded_obj
-                    self.__component_colours[key] = colour
+        if to_parse:
+            from concurrent.futures import ProcessPoolExecutor  # Pulls in multiprocessing, only pay for it when used
 
-                    if loaded_obj.min_xy[0] < self.min_xy[0]: self.min_xy[0] = loaded_obj.min_xy[0]
-                    if loaded_obj.max_xy[0] > self.max_xy[0]: self.max_xy[0] = loaded_obj.max_xy[0]
-                    if loaded_obj.min_xy[1] < self.min_xy[1]: self.min_xy[1] = loaded_obj.min_xy[1]
-                    if loaded_obj.max_xy[1] > self.max_xy[1]: self.max_xy[1] = loaded_obj.max_xy[1]
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(to_parse))) as executor:
+                futures = [(executor.submit(load_layer, self.path, file, loader), loader, key, colour, cache_key) for file, loader, key, colour, cache_key in to_parse]
+
+                for future, loader, key, colour, cache_key in futures:
+                    layer = loader.from_geometry(LayerGeometry.from_arrays(**future.result()))
+                    self.__add_parsed(layer, key, colour, cache_key)
+
+        self.__sort_components()
 
     def has_bottom_layer(self):
         return "BottomLayer" in self.__components
@@ -55,9 +121,29 @@ class PCB:
     def get_component(self, name):
         return self.__components[name]
 
+    def __reduce_bounds(self) -> tuple:
+        """ Combines the cached bounds of every loaded layer """
+        min_xy = [math.inf, math.inf]
+        max_xy = [-math.inf, -math.inf]
+
+        for component in self.__components.values():
+            (min_x, min_y), (max_x, max_y) = component.geometry.bounds
+
+            min_xy = [min(min_xy[0], min_x), min(min_xy[1], min_y)]
+            max_xy = [max(max_xy[0], max_x), max(max_xy[1], max_y)]
+
+        return min_xy, max_xy
+
+    @property
+    def min_xy(self) -> list:
+        return self.__reduce_bounds()[0]
+
+    @property
+    def max_xy(self) -> list:
+        return self.__reduce_bounds()[1]
+
     def get_shape(self):
-        min_x, min_y = self.min_xy
-        max_x, max_y = self.max_xy
+        (min_x, min_y), (max_x, max_y) = self.__reduce_bounds()
 
         return max_x - min_x, max_y - min_y
 
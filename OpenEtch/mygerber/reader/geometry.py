@@ -0,0 +1,197 @@
+import numpy as np
+import math
+
+
+SEGMENT_DTYPE = np.dtype([("x1", np.float64), ("y1", np.float64), ("x2", np.float64), ("y2", np.float64), ("width", np.float64)])
+HOLE_DTYPE = np.dtype([("x", np.float64), ("y", np.float64), ("diameter", np.float64)])
+
+
+class GrowableArray:
+    """ Append only numpy array with amortised (doubling) growth """
+    def __init__(self, dtype, item_shape=(), capacity=64):
+        self.__data = np.empty((capacity, *item_shape), dtype=dtype)
+        self.__size = 0
+
+    def __len__(self):
+        return self.__size
+
+    def __reserve(self, extra):
+        needed = self.__size + extra
+        if needed > len(self.__data):
+            grown = np.empty((max(needed, len(self.__data) * 2), *self.__data.shape[1:]), dtype=self.__data.dtype)
+            grown[:self.__size] = self.__data[:self.__size]
+            self.__data = grown
+
+    def append(self, item):
+        self.__reserve(1)
+        self.__data[self.__size] = item
+        self.__size += 1
+
+    def extend(self, items):
+        items = np.asarray(items, dtype=self.__data.dtype)
+        self.__reserve(len(items))
+        self.__data[self.__size:self.__size + len(items)] = items
+        self.__size += len(items)
+
+    @property
+    def array(self) -> np.ndarray:
+        """ View of the filled part of the buffer (no copy) """
+        return self.__data[:self.__size]
+
+    def __getstate__(self):
+        # Drop the unused capacity when sent to / from worker processes
+        return {"data": self.array.copy()}
+
+    def __setstate__(self, state):
+        self.__data = state["data"]
+        self.__size = len(state["data"])
+
+
+class LayerGeometry:
+    """
+    Columnar store of everything a layer draws:
+        segments         - structured array (x1, y1, x2, y2, width)
+        polygon_vertices - flat (n, 2) vertex buffer of every flashed aperture
+        polygon_offsets  - start index of each polygon in polygon_vertices, with the total vertex count appended
+        holes            - structured array (x, y, diameter)
+
+    The old list of tuples is still available through .commands, built lazily.
+    Bounds are computed from the arrays on first use and cached until the geometry changes.
+    """
+    def __init__(self):
+        self.__segments = GrowableArray(SEGMENT_DTYPE)
+        self.__holes = GrowableArray(HOLE_DTYPE)
+        self.__polygon_vertices = GrowableArray(np.float64, item_shape=(2,), capacity=256)
+        self.__polygon_offsets = GrowableArray(np.int64)
+        self.__polygon_offsets.append(0)
+
+        self.__commands = None
+        self.__bounds = None
+
+    def __getstate__(self):
+        # Only the arrays are sent between processes, the tuple view is rebuilt on demand
+        state = self.__dict__.copy()
+        state["_LayerGeometry__commands"] = None
+        return state
+
+    @classmethod
+    def from_arrays(cls, segments, polygon_vertices, polygon_offsets, holes):
+        """ Rebuilds geometry from the arrays given by to_arrays() """
+        geometry = cls()
+        geometry.__segments.extend(segments)
+        geometry.__polygon_vertices.extend(np.asarray(polygon_vertices).reshape(-1, 2))
+        geometry.__polygon_offsets.extend(polygon_offsets[1:])
+        geometry.__holes.extend(holes)
+
+        return geometry
+
+    def to_arrays(self) -> dict:
+        return {
+            "segments": self.segments,
+            "polygon_vertices": self.polygon_vertices,
+            "polygon_offsets": self.polygon_offsets,
+            "holes": self.holes
+        }
+
+    def __changed(self) -> None:
+        self.__commands = None
+        self.__bounds = None
+
+    def add_segment(self, x1, y1, x2, y2, width) -> None:
+        self.__segments.append((x1, y1, x2, y2, width))
+        self.__changed()
+
+    def add_segments(self, segments) -> None:
+        """ Adds many segments at once, from an (n, 5) array-like of x1, y1, x2, y2, width """
+        segments = np.ascontiguousarray(segments, dtype=np.float64).reshape(-1, 5)
+        self.__segments.extend(segments.view(SEGMENT_DTYPE).reshape(-1))  # Every field is a float64, so rows view straight onto records
+        self.__changed()
+
+    def add_polygon(self, points) -> None:
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self.__polygon_vertices.extend(points)
+        self.__polygon_offsets.append(len(self.__polygon_vertices))
+        self.__changed()
+
+    def add_hole(self, x, y, diameter) -> None:
+        self.__holes.append((x, y, diameter))
+        self.__changed()
+
+    @property
+    def segments(self) -> np.ndarray:
+        return self.__segments.array
+
+    @property
+    def holes(self) -> np.ndarray:
+        return self.__holes.array
+
+    @property
+    def polygon_vertices(self) -> np.ndarray:
+        return self.__polygon_vertices.array
+
+    @property
+    def polygon_offsets(self) -> np.ndarray:
+        return self.__polygon_offsets.array
+
+    @property
+    def polygon_count(self) -> int:
+        return len(self.__polygon_offsets) - 1
+
+    def polygons(self):
+        """ Iterate over each flashed polygon as an (n, 2) view into the vertex buffer """
+        vertices = self.polygon_vertices
+        offsets = self.polygon_offsets
+
+        for start, end in zip(offsets[:-1], offsets[1:]):
+            yield vertices[start:end]
+
+    def __compute_bounds(self) -> tuple:
+        lows, highs = [], []
+
+        segments = self.segments
+        if len(segments) > 0:
+            radius = segments["width"] / 2
+            lows.append((min((segments["x1"] - radius).min(), (segments["x2"] - radius).min()),
+                         min((segments["y1"] - radius).min(), (segments["y2"] - radius).min())))
+            highs.append((max((segments["x1"] + radius).max(), (segments["x2"] + radius).max()),
+                          max((segments["y1"] + radius).max(), (segments["y2"] + radius).max())))
+
+        vertices = self.polygon_vertices
+        if len(vertices) > 0:
+            lows.append(vertices.min(axis=0))
+            highs.append(vertices.max(axis=0))
+
+        holes = self.holes
+        if len(holes) > 0:
+            radius = holes["diameter"] / 2
+            lows.append(((holes["x"] - radius).min(), (holes["y"] - radius).min()))
+            highs.append(((holes["x"] + radius).max(), (holes["y"] + radius).max()))
+
+        if not lows:
+            return [math.inf, math.inf], [-math.inf, -math.inf]
+
+        return np.min(lows, axis=0).tolist(), np.max(highs, axis=0).tolist()
+
+    @property
+    def bounds(self) -> tuple:
+        """ (min_xy, max_xy) of everything drawn, padded by trace width and drill radius """
+        if self.__bounds is None:
+            self.__bounds = self.__compute_bounds()
+
+        min_xy, max_xy = self.__bounds
+        return list(min_xy), list(max_xy)
+
+    def __len__(self):
+        return len(self.__segments) + self.polygon_count + len(self.__holes)
+
+    @property
+    def commands(self) -> list:
+        """ Compatibility view: ("line", x1, y1, x2, y2, w), ("blit", [(x, y), ...]) and ("hole", x, y, d) tuples """
+        if self.__commands is None:
+            commands = [("line", *segment) for segment in self.segments.tolist()]
+            commands += [("blit", list(map(tuple, polygon.tolist()))) for polygon in self.polygons()]
+            commands += [("hole", *hole) for hole in self.holes.tolist()]
+
+            self.__commands = commands
+
+        return self.__commands
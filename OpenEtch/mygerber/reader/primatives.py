@@ -1,6 +1,15 @@
+from functools import lru_cache
 from copy import deepcopy
+import numpy as np
 import math
 
+
+# Upper bound on compiled apertures kept around, only reached by pathological files
+APERTURE_CACHE_SIZE = 1024
+
+CIRCLE_RESOLUTION = 50
+UNIT_CIRCLE = [(math.cos(a), math.sin(a)) for a in [i * (2 * math.pi / CIRCLE_RESOLUTION) for i in range(CIRCLE_RESOLUTION)]]
+
 def get_defaults():
     return deepcopy({
             "C": {
@@ -55,6 +64,20 @@ class ApertureMacroManager:
     def get_aperture(self) -> dict:
         return self.macro_definitions[self.current_macro]
 
+    def get_aperture_polygon(self) -> np.ndarray:
+        """
+        Origin centred vertices of the active aperture, compiled once per (shape, params).
+        The returned array is shared, translate it rather than editing it.
+        """
+        aperture = self.get_aperture()
+
+        if aperture["shape"] in self.macro_shapes:
+            shape = self.macro_shapes[aperture["shape"]]
+        else:
+            shape = self.macro_definitions[aperture["shape"]]
+
+        return compile_aperture(shape["primitive"], tuple(shape["params"]), tuple(aperture["params"]))
+
 
     def __getattr__(self, name: str) -> object:
         """ Retrieve loaded segment """
@@ -125,7 +148,7 @@ def primitive_to_lines(shape, def_params):
 
         if visible == 1:
             r = width / 2
-            return [(r * math.cos(a), r * math.sin(a)) for a in [i * (2 * math.pi / 50) for i in range(50)]]
+            return [(r * cos_a, r * sin_a) for cos_a, sin_a in UNIT_CIRCLE]
 
     elif shape["primitive"] == "oval_rect":
         visible, width, height = params
@@ -152,3 +175,12 @@ def primitive_to_lines(shape, def_params):
         raise NotImplementedError(f"Unknown Primitive '{shape['primitive']}'")
 
     return []
+
+
+@lru_cache(maxsize=APERTURE_CACHE_SIZE)
+def compile_aperture(primitive: str, shape_params: tuple, def_params: tuple) -> np.ndarray:
+    """ Cached, read only (n, 2) vertex array of primitive_to_lines """
+    points = np.array(primitive_to_lines({"primitive": primitive, "params": list(shape_params)}, def_params), dtype=np.float64).reshape(-1, 2)
+    points.flags.writeable = False
+
+    return points
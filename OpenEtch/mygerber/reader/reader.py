@@ -1,27 +1,55 @@
+from .tokenizer import tokenize_line
+
+
+STATEMENT_CHUNK_SIZE = 64 * 1024
+
 
 def extract_line_data(data):
-    output = {}
+    """ Kept for compatibility, see tokenizer.tokenize_line """
+    return tokenize_line(data)
+
+
+def read_lines(fp):
+    """
+    Lazily yields each line of a file, without the newline.
+    Used for excellon (drill) files, which are line based.
 
-    started_reading_number = False
-    current_value = ""
-    current_name = ""
+    :param fp: Open text file object
+    :return: generator of str
+    """
+    for line in fp:
+        yield line.rstrip("\r\n")
 
-    for char in list(data):
-        if char in "0123456789-.":
-            started_reading_number = True
-            current_value += char
 
-        else:
-            if started_reading_number:
-                started_reading_number = False
-                output[current_name] = current_value
+def read_statements(fp, chunk_size=STATEMENT_CHUNK_SIZE):
+    """
+    Lazily yields each statement of a gerber file, reading it in fixed size chunks.
+    Extended commands ("%...%") are yielded whole even if they span several lines,
+    data blocks are split on their "*" terminator so several can share a line.
 
-                current_value = ""
-                current_name = char
+    :param fp: Open text file object
+    :param chunk_size: Characters read per chunk
+    :return: generator of str, e.g. "%FSLAX45Y45*%", "X100Y200D01*"
+    """
+    buffer = ""
+
+    for chunk in iter(lambda: fp.read(chunk_size), ""):
+        buffer += chunk.replace("\r", "").replace("\n", "")
+        start = 0
+
+        while start < len(buffer):
+            if buffer[start] == "%":
+                end = buffer.find("%", start + 1)
             else:
-                current_name += char
+                end = buffer.find("*", start)
+
+            if end == -1:
+                break  # Statement continues in the next chunk
+
+            yield buffer[start:end + 1]
+            start = end + 1
 
-    if current_name != "" and current_value != "":
-        output[current_name] = current_value
+        buffer = buffer[start:]
 
-    return output
\ No newline at end of file
+    if buffer:
+        yield buffer
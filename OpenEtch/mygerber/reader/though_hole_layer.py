@@ -1,21 +1,19 @@
-from .reader import extract_line_data
+from .tokenizer import tokenize
+from .reader import read_lines
 from .value_parser import ValueParser
 from .primatives import ApertureMacroManager, primitive_to_lines
+from .geometry import LayerGeometry
 
-import math
 
 class ThoughHole:
     def __init__(self, fp):
         self.drill_sizes = {}
         self.current_drill = None
 
-        self.min_xy = [math.inf, math.inf]
-        self.max_xy = [-math.inf, -math.inf]
-
         # Default values (assumed)
         self.value_parser = ValueParser(True, True, 3, 3)
 
-        self.commands = []
+        self.geometry = LayerGeometry()
         self.__load(fp)
 
     def __set_format_spec(self, line):
@@ -44,7 +42,7 @@ class ThoughHole:
         self.value_parser.absolute = is_abs
 
     def __load(self, fp):
-        for i, line in enumerate(fp.read().split("\n")):
+        for i, (line, values) in enumerate(tokenize(read_lines(fp))):
             if line.startswith("\n"):
                 continue
 
@@ -54,7 +52,6 @@ class ThoughHole:
             if i == 1:
                 self.__set_format_spec(line)
 
-            values = extract_line_data(line)
             if "T" in values:
                 if len(line) > 3:
                     if line[3] == "C":
@@ -76,11 +73,25 @@ class ThoughHole:
                 x_pos, y_pos = self.value_parser.parse_value(values["X"]), self.value_parser.parse_value(values["Y"])
                 drill_size = self.drill_sizes[self.current_drill]
 
-                if x_pos - (drill_size / 2) < self.min_xy[0]: self.min_xy[0] = x_pos - (drill_size / 2)
-                if x_pos + (drill_size / 2) > self.max_xy[0]: self.max_xy[0] = x_pos + (drill_size / 2)
-                if y_pos - (drill_size / 2) < self.min_xy[1]: self.min_xy[1] = y_pos - (drill_size / 2)
-                if y_pos + (drill_size / 2) > self.max_xy[1]: self.max_xy[1] = y_pos + (drill_size / 2)
 
-                self.commands.append(("hole", x_pos, y_pos, drill_size))
+                self.geometry.add_hole(x_pos, y_pos, drill_size)
+
+    @classmethod
+    def from_geometry(cls, geometry: LayerGeometry):
+        """ Creates a layer from already parsed geometry (e.g. from the layer cache) without parsing a file """
+        layer = cls.__new__(cls)
+        layer.geometry = geometry
+        return layer
+
+    @property
+    def commands(self) -> list:
+        """ Tuple view of the layer geometry, see LayerGeometry.commands """
+        return self.geometry.commands
 
+    @property
+    def min_xy(self) -> list:
+        return self.geometry.bounds[0]
 
+    @property
+    def max_xy(self) -> list:
+        return self.geometry.bounds[1]
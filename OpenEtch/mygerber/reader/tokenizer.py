@@ -0,0 +1,30 @@
+import re
+
+
+# A code is every non numeric character since the previous value, a value is a run of "0123456789-."
+# This matches the behaviour of the old character by character reader, but runs inside the regex engine.
+TOKEN_PATTERN = re.compile(r"([^0-9.\-]*)([0-9.\-]+)")
+
+
+def tokenize_line(line: str) -> dict:
+    """
+    Splits a single gerber / excellon line into its codes and values.
+    Later codes overwrite earlier ones, e.g. "X100Y200D01*" -> {"X": "100", "Y": "200", "D": "01"}
+
+    :param line: Raw line from the file
+    :return: dict of code -> value string
+    """
+    return dict(TOKEN_PATTERN.findall(line))
+
+
+def tokenize(lines):
+    """
+    Lazily tokenizes an iterable of lines in one pass.
+
+    :param lines: Any iterable of str (list, file object, generator)
+    :return: generator of (line, values)
+    """
+    findall = TOKEN_PATTERN.findall
+
+    for line in lines:
+        yield line, dict(findall(line))
@@ -1,19 +1,18 @@
-from .reader import extract_line_data
+from .tokenizer import tokenize
+from .reader import read_statements
 from .value_parser import ValueParser
-from .primatives import ApertureMacroManager, primitive_to_lines
+from .primatives import ApertureMacroManager
+from .geometry import LayerGeometry
 
 import math
 
 
 class TraceLayer:
     def __init__(self, fp):
-        self.commands = []
+        self.geometry = LayerGeometry()
 
         self.aperture_macros = ApertureMacroManager()
 
-        self.min_xy = [math.inf, math.inf]
-        self.max_xy = [-math.inf, -math.inf]
-
         # Default values (assumed)
         self.x_value_parser = ValueParser(True, True, 4, 5)
         self.y_value_parser = ValueParser(True, True, 4, 5)
@@ -49,7 +48,7 @@ class TraceLayer:
         g_mode = None
         last_x, last_y = None, None
 
-        for line in fp.read().split("\n"):
+        for line, values in tokenize(read_statements(fp)):
             if line.startswith(";"):
                 continue
 
@@ -65,9 +64,6 @@ class TraceLayer:
             if line.startswith('%ADD'):
                 self.aperture_macros.define_aperture(line)
 
-
-            values = extract_line_data(line)
-
             if values:
                 if "G" in values:
                     if values["G"] == "04":
@@ -88,10 +84,6 @@ class TraceLayer:
                     if active_aperture["shape"] == "C":
                         width = float(active_aperture["params"][0])
 
-                    if x_pos - (width / 2) < self.min_xy[0]: self.min_xy[0] = x_pos - (width / 2)
-                    if x_pos + (width / 2) > self.max_xy[0]: self.max_xy[0] = x_pos + (width / 2)
-                    if y_pos - (width / 2) < self.min_xy[1]: self.min_xy[1] = y_pos - (width / 2)
-                    if y_pos + (width / 2) > self.max_xy[1]: self.max_xy[1] = y_pos + (width / 2)
 
                     if values["D"] == "02":  # move, dont draw
                         last_x, last_y = x_pos, y_pos
@@ -101,34 +93,18 @@ class TraceLayer:
                             if last_x is None or last_y is None:
                                 raise Exception("Attempting to draw line without moving to start location")
 
-                            self.commands.append(
-                                ("line", last_x, last_y, x_pos, y_pos, width)
-                            )
+                            self.geometry.add_segment(last_x, last_y, x_pos, y_pos, width)
                             last_x, last_y = x_pos, y_pos
 
                         elif values["D"] == "02":
                             pass
 
                         elif values["D"] == "03":  # blit aperture
-                            if active_aperture["shape"] in self.aperture_macros.macro_shapes:
-                                shape = self.aperture_macros.macro_shapes[active_aperture["shape"]]
-                            else:
-                                shape = self.aperture_macros.macro_definitions[active_aperture["shape"]]
-
-                            aperture_points = primitive_to_lines(shape, active_aperture["params"])
-                            aperture_points = [(x_pos + px, y_pos + py) for px, py in aperture_points]
+                            aperture_points = self.aperture_macros.get_aperture_polygon() + (x_pos, y_pos)
 
                             last_x, last_y = x_pos, y_pos
 
-                            self.commands.append(
-                                ("blit", aperture_points)
-                            )
-
-                            for x_pos, y_pos in aperture_points:
-                                if x_pos < self.min_xy[0]: self.min_xy[0] = x_pos
-                                if x_pos > self.max_xy[0]: self.max_xy[0] = x_pos
-                                if y_pos < self.min_xy[1]: self.min_xy[1] = y_pos
-                                if y_pos > self.max_xy[1]: self.max_xy[1] = y_pos
+                            self.geometry.add_polygon(aperture_points)
 
                         else:
                             raise Exception(f"Unknown value for D when parsing a line. '{values["D"]}'")
@@ -157,9 +133,8 @@ class TraceLayer:
                                       for i in range(20 + 1)]
 
                         last_x, last_y = arc_points[-1]
-                        for i, point in enumerate(arc_points[1:]):
-                            self.commands.append(
-                                ('line', point[0], point[1], arc_points[i][0], arc_points[i][1], width))
+                        self.geometry.add_segments(
+                            [(point[0], point[1], arc_points[i][0], arc_points[i][1], width) for i, point in enumerate(arc_points[1:])])
 
                     elif g_mode == "03":  # arc (opposite rotation)
                         i, j, d = self.x_value_parser.parse_value(values["I"]), self.y_value_parser.parse_value(values["J"]), values["D"]
@@ -186,7 +161,26 @@ class TraceLayer:
                                       for i in range(20 + 1)]
 
                         last_x, last_y = arc_points[-1]
-                        for i, point in enumerate(arc_points[1:]):
-                            self.commands.append(
-                                ('line', point[0], point[1], arc_points[i][0], arc_points[i][1], width))
+                        self.geometry.add_segments(
+                            [(point[0], point[1], arc_points[i][0], arc_points[i][1], width) for i, point in enumerate(arc_points[1:])])
+
+
+    @classmethod
+    def from_geometry(cls, geometry: LayerGeometry):
+        """ Creates a layer from already parsed geometry (e.g. from the layer cache) without parsing a file """
+        layer = cls.__new__(cls)
+        layer.geometry = geometry
+        return layer
+
+    @property
+    def commands(self) -> list:
+        """ Tuple view of the layer geometry, see LayerGeometry.commands """
+        return self.geometry.commands
+
+    @property
+    def min_xy(self) -> list:
+        return self.geometry.bounds[0]
 
+    @property
+    def max_xy(self) -> list:
+        return self.geometry.bounds[1]
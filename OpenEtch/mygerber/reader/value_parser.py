@@ -14,17 +14,16 @@ class ValueParser:
 
 
     def parse_value(self, value: str):
+        # Works on the integer directly instead of re-padding the string with zeros
         if self.leading_zeros:
-            stripped = value.lstrip('0')
-            value = ("0" * ((self.before_decimal+self.after_decimal) - len(stripped))) + stripped
+            parsed_value = int(value) / (10 ** self.after_decimal)
         else:
             stripped = value.rstrip('0')
-            value = stripped + ("0" * ((self.before_decimal + self.after_decimal) - len(stripped)))
-
-        if "-" in value:  # Ensure that we haven't made a value looking like 00-48910
-            value = "-" + value.replace("-", "")
-
-        parsed_value = int(value) / (10 ** self.after_decimal)
+            if stripped in ("", "-"):
+                parsed_value = 0.0
+            else:
+                padding = max((self.before_decimal + self.after_decimal) - len(stripped), 0)
+                parsed_value = (int(stripped) * (10 ** padding)) / (10 ** self.after_decimal)
 
         if self.unit == "IN":
             parsed_value = parsed_value * 25.4  # convert from inch to mm, cos bri'ish
@@ -1,4 +1,5 @@
 from PIL import Image, ImageDraw
+import numpy as np
 import math
 
 COLOUR_COPPER = (79, 50, 24)
@@ -27,26 +28,45 @@ def render_pcb(pcb, is_in_colour: bool=True, scale_size: int=20):
 
 
 
+def image_size(shape):
+    """ Size of a GerberView's full image, a few rows taller than the board """
+    return shape[0], shape[1] + 4
+
+
 class GerberView:
-    def __init__(self, shape, in_colour, base_colour, scale_size, offset=None):
+    def __init__(self, shape, in_colour, base_colour, scale_size, offset=None, rows=None):
+        """
+        :param rows: Optional (first, end) rows of the full image to draw, so a large board can be rendered in strips.
+            Pixels come out exactly as they would in the full image
+        """
         self.shape = shape
         self.in_colour = in_colour
         self.scale = scale_size
         self.offset_x, self.offset_y = offset if offset is not None else (0, 0)
+        self.first_row, end_row = rows if rows is not None else (0, image_size(shape)[1])
 
-        self.image = Image.new("RGB" if in_colour else "1", (shape[0], shape[1]+4), base_colour)
+        self.image = Image.new("RGB" if in_colour else "1", (shape[0], end_row - self.first_row), base_colour)
         self.draw = ImageDraw.Draw(self.image)
 
+    def __to_pixels(self, x, y):
+        """ Converts arrays of board positions (mm) to image pixels """
+        return np.round((x + self.offset_x) * self.scale).astype(np.int64), self.shape[1] - self.first_row - np.round((y + self.offset_y) * self.scale).astype(np.int64)
+
     def draw_pcb_from_outline(self, layer, colour):
         points = []
         width = 1
-        if hasattr(layer, "commands"):
-            for command in layer.commands:
-                if command[0] == "line":
-                    x1, y1, x2, y2, width = command[1], command[2], command[3], command[4], command[5]
+        if hasattr(layer, "geometry"):
+            segments = layer.geometry.segments
+
+            if len(segments) > 0:
+                width = segments["width"][-1].item()
 
-                    points.append((round((x1 + self.offset_x) * self.scale), round(self.shape[1] - (y1 + self.offset_y) * self.scale)))
-                    points.append((round((x2 + self.offset_x) * self.scale), round(self.shape[1] - (y2 + self.offset_y) * self.scale)))
+                start_x = np.round((segments["x1"] + self.offset_x) * self.scale).astype(np.int64)
+                start_y = np.round(self.shape[1] - (segments["y1"] + self.offset_y) * self.scale).astype(np.int64) - self.first_row
+                end_x = np.round((segments["x2"] + self.offset_x) * self.scale).astype(np.int64)
+                end_y = np.round(self.shape[1] - (segments["y2"] + self.offset_y) * self.scale).astype(np.int64) - self.first_row
+
+                points = np.stack((start_x, start_y, end_x, end_y), axis=1).ravel().tolist()
 
         self.draw.polygon(points, colour, width=width)
 
@@ -54,18 +74,34 @@ class GerberView:
         self.image.show()
 
     def add_layer(self, layer, colour: int | tuple[int, int, int]):
-        if hasattr(layer, "commands"):
-            for command in layer.commands:
-                if command[0] == "line":
-                    x1, y1, x2, y2,width = command[1], command[2], command[3], command[4], command[5]
+        if not hasattr(layer, "geometry"):
+            return
+
+        geometry = layer.geometry
+
+        segments = geometry.segments
+        if len(segments) > 0:
+            start_x, start_y = self.__to_pixels(segments["x1"], segments["y1"])
+            end_x, end_y = self.__to_pixels(segments["x2"], segments["y2"])
+            widths = np.round(segments["width"] * self.scale).astype(np.int64)
+
+            for line in np.stack((start_x, start_y, end_x, end_y, widths), axis=1).tolist():
+                self.draw.line(line[:4], colour, line[4])
 
-                    self.draw.line([round((x1+ self.offset_x) * self.scale), self.shape[1] - round((y1+ self.offset_y) * self.scale), round((x2+self.offset_x) * self.scale), self.shape[1] - round((y2+ self.offset_y) * self.scale)], colour, round(width * self.scale))
+        if geometry.polygon_count > 0:
+            vertices = geometry.polygon_vertices
+            pixel_x, pixel_y = self.__to_pixels(vertices[:, 0], vertices[:, 1])
+            pixel_points = np.stack((pixel_x, pixel_y), axis=1)
 
-                if command[0] == "blit":
-                    points = [(round((x+self.offset_x) * self.scale), self.shape[1] - round((y + self.offset_y) * self.scale)) for x, y in command[1]]
-                    self.draw.polygon(points, colour)
+            offsets = geometry.polygon_offsets.tolist()
+            for start, end in zip(offsets[:-1], offsets[1:]):
+                if end > start:
+                    self.draw.polygon(pixel_points[start:end].ravel().tolist(), colour)
 
-                if command[0] == "hole":
-                    x, y, diameter = command[1:]
-                    self.draw.circle([round((x+self.offset_x)*self.scale), self.shape[1] - round((y+ self.offset_y)*self.scale)], round((diameter/2)*self.scale), colour)
+        holes = geometry.holes
+        if len(holes) > 0:
+            pixel_x, pixel_y = self.__to_pixels(holes["x"], holes["y"])
+            radii = np.round((holes["diameter"] / 2) * self.scale).astype(np.int64)
 
+            for x, y, radius in np.stack((pixel_x, pixel_y, radii), axis=1).tolist():
+                self.draw.circle([x, y], radius, colour)
@@ -1,6 +1,6 @@
 import zipfile
-import shutil
-import uuid
+import hashlib
+import io
 import os
 
 
@@ -11,46 +11,72 @@ class GerberFile:
 
         self.path: str = path
         self.true_path: None | str = None
-        self.has_extracted: bool = False
+        self.archive: None | zipfile.ZipFile = None
+        self.archive_members: set = set()
 
         self.opened_files: list = []
 
     def __enter__(self):
-        if os.path.isfile(self.path):
-            self.has_extracted = True
-            self.true_path = str(uuid.uuid4())
-
-            os.makedirs(self.true_path, exist_ok=True)
-            with zipfile.ZipFile(self.path, 'r') as zip_ref:
-                zip_ref.extractall(self.true_path)
+        if os.path.isfile(self.path):  # Read members straight out of the zip, nothing is extracted
+            self.archive = zipfile.ZipFile(self.path, 'r')
+            self.archive_members = set(self.archive.namelist())
+            self.true_path = None
 
         else:
             self.true_path = self.path
-            self.has_extracted = False
+            self.archive = None
 
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        # Ensure all files we gave out are closed before deleting / closing
+        # Ensure all files we gave out are closed before closing the archive
         for file in self.opened_files:
             if not file.closed:
                 file.close()
 
-        if self.has_extracted:  # Remove extracted zip
-            shutil.rmtree(self.true_path)
+        if self.archive is not None:
+            self.archive.close()
+            self.archive = None
 
         return False  # Ensure errors within loading still show
 
+    def has_file(self, path) -> bool:
+        if self.archive is not None:
+            return path in self.archive_members
+
+        return os.path.exists(os.path.join(self.true_path, path))
+
+    def hash_file(self, path) -> str:
+        """ SHA-256 of a file's contents, read in chunks """
+        sha = hashlib.sha256()
+
+        with self.open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                sha.update(chunk)
+
+        return sha.hexdigest()
+
     def open(self, path, mode):
         """
         Safely opens and returns a file object. Closes automatically when done.
         Or returns None if file does not exist.
+        Zip members are decompressed lazily as they are read.
 
         :param path:
         :param mode:
         :return: None | open(path, mode)
         """
-        if os.path.exists(os.path.join(self.true_path, path)):
-            file = open(os.path.join(self.true_path, path), mode)
+        if not self.has_file(path):
+            return None
+
+        if self.archive is not None:
+            file = self.archive.open(path, "r")
+            if "b" not in mode:
+                file = io.TextIOWrapper(file)
+
             self.opened_files.append(file)
             return file
+
+        file = open(os.path.join(self.true_path, path), mode)
+        self.opened_files.append(file)
+        return file
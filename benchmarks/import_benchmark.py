@@ -0,0 +1,70 @@
+"""
+Import time budget check, measured with `python -X importtime` in a fresh interpreter per module.
+Fails (exit code 1) if a module takes longer than its budget, e.g. if pygame / pyopencl start being imported eagerly again.
+
+Usage: python -m benchmarks.import_benchmark
+"""
+import subprocess
+import sys
+
+
+# Module: budget in ms, cumulative import time including the module's dependencies (numpy, PIL, reportlab)
+BUDGETS = {
+    "OpenEtch": 600,
+    "OpenEtch.mygerber": 600,
+    "OpenEtch.mygerber.cnc": 600,
+    "OpenEtch.mygerber.cnc.convertor": 700,
+}
+
+# Only imported when the GUI / CNC outlines are actually used
+FORBIDDEN_MODULES = ["pygame", "pyopencl", "tkinter"]
+
+REPEATS = 3
+
+
+def measure_import(module: str) -> tuple[float, set]:
+    """
+    :return: (cumulative import time of module in ms, names of every module it imported)
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True, check=True)
+
+    imported = set()
+    total = 0.0
+
+    # Lines look like "import time:   self [us] | cumulative | imported package"
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        _, cumulative, name = line[len("import time:"):].split("|")
+        imported.add(name.strip())
+
+        if name.strip() == module:
+            total = int(cumulative) / 1000
+
+    return total, imported
+
+
+def check_module(module: str, budget: float) -> bool:
+    times = []
+    imported = set()
+
+    for _ in range(REPEATS):
+        total, imported = measure_import(module)
+        times.append(total)
+
+    best = min(times)
+    eager = [name for name in imported if name.split(".")[0] in FORBIDDEN_MODULES]
+
+    passed = best <= budget and not eager
+    print(f"[Benchmark] {module}: {best:.1f}ms (budget {budget}ms) {'ok' if passed else 'FAILED'}")
+
+    if eager:
+        print(f"    imports {', '.join(sorted(eager))} eagerly")
+
+    return passed
+
+
+if __name__ == "__main__":
+    results = [check_module(module, budget) for module, budget in BUDGETS.items()]
+    sys.exit(0 if all(results) else 1)
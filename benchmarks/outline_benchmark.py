@@ -0,0 +1,58 @@
+"""
+Outline backend benchmark, times create_outline on the rendered copper of the bundled boards at several Settings.scale values.
+Backends that can't run here (no OpenCL device) are skipped, the outlines of the rest are checked to be identical.
+
+Usage: python -m benchmarks.outline_benchmark [zip ...]
+"""
+import time
+import sys
+import os
+
+import numpy as np
+
+from OpenEtch import PCB
+from OpenEtch.mygerber.cnc.gerber_to_image import convert_gerber_to_image
+from OpenEtch.mygerber.cnc.outline_backend import BACKENDS
+from OpenEtch.mygerber.cnc.settings import DefaultSettings
+from OpenEtch.mygerber.cnc import gpu_path_generator
+
+
+DEFAULT_BOARDS = ["test_gerber.zip", "keyboard_gerber.zip"]
+SCALES = [25, 50, 100]
+REPEATS = 3
+
+
+def available_backends():
+    return {name: backend for name, backend in BACKENDS.items() if name != "opencl" or gpu_path_generator.is_available()}
+
+
+def benchmark_board(path):
+    pcb = PCB(path)
+    backends = available_backends()
+
+    print(f"[Benchmark] {os.path.basename(path)}")
+
+    for scale in SCALES:
+        settings = type("BenchmarkSettings", (DefaultSettings,), {"scale": scale})
+        outline_width = round(settings.cutting_tool_width * settings.scale)
+
+        top_view, _ = convert_gerber_to_image(pcb, settings)
+
+        outlines = {}
+        for name, backend in backends.items():
+            start = time.perf_counter()
+            for _ in range(REPEATS):
+                outlines[name] = backend.create_outline(top_view, outline_width)
+            elapsed = (time.perf_counter() - start) / REPEATS
+
+            megapixels = top_view.size[0] * top_view.size[1] / 1e6
+            print(f"    scale {scale} ({top_view.size[0]}x{top_view.size[1]}, tool {outline_width}px) {name}: {elapsed * 1000:.1f}ms ({megapixels / elapsed:.1f} MPixels/sec)")
+
+        reference = np.array(next(iter(outlines.values())))
+        if any(not np.array_equal(reference, np.array(outline)) for outline in outlines.values()):
+            print(f"    scale {scale}: backends produced DIFFERENT outlines")
+
+
+if __name__ == "__main__":
+    for board in sys.argv[1:] or DEFAULT_BOARDS:
+        benchmark_board(board)
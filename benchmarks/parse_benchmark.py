@@ -0,0 +1,50 @@
+"""
+Parse benchmark for the bundled gerber zips, reports lines/sec for the tokenizer and for a full PCB load.
+
+Usage: python -m benchmarks.parse_benchmark [zip ...]
+"""
+import zipfile
+import time
+import sys
+import os
+
+from OpenEtch import PCB
+from OpenEtch.mygerber.reader.tokenizer import tokenize
+
+
+DEFAULT_BOARDS = ["test_gerber.zip", "keyboard_gerber.zip"]
+REPEATS = 20
+
+
+def read_lines(path):
+    lines = []
+    with zipfile.ZipFile(path, "r") as zip_ref:
+        for name in zip_ref.namelist():
+            if name.endswith((".GBL", ".GBO", ".GTL", ".GTO", ".GKO", ".DRL")):
+                lines += zip_ref.read(name).decode().split("\n")
+
+    return lines
+
+
+def benchmark_board(path):
+    lines = read_lines(path)
+
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        for _ in tokenize(lines):
+            pass
+    tokenize_time = (time.perf_counter() - start) / REPEATS
+
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        PCB(path)
+    load_time = (time.perf_counter() - start) / REPEATS
+
+    print(f"[Benchmark] {os.path.basename(path)}: {len(lines)} lines")
+    print(f"    tokenize: {tokenize_time * 1000:.2f}ms ({len(lines) / tokenize_time:,.0f} lines/sec)")
+    print(f"    PCB load: {load_time * 1000:.2f}ms ({len(lines) / load_time:,.0f} lines/sec)")
+
+
+if __name__ == "__main__":
+    for board in sys.argv[1:] or DEFAULT_BOARDS:
+        benchmark_board(board)